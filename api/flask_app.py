@@ -1,7 +1,8 @@
-from flask import Flask, request, url_for, jsonify, abort, make_response
+from flask import Flask, Response, request, url_for, jsonify, abort, make_response
 import random
 import sys
 import json
+import threading
 import hcc_risk_models as hrm
 
 
@@ -10,6 +11,27 @@ app.secret_key = 'This is really unique and secret'
 base_route = '/hcc_risk_models/api/v1.0'
 
 
+# every worker holds one long-lived, read-only instance of each model.
+# the models are loaded in the background as soon as the app starts so
+# the worker can answer the readiness probe while it is still warming up.
+# because of this thread, evaluate_risk(workers=N) in the app starts its
+# processes with 'forkserver' rather than 'fork' (see common/parallel.py),
+# and each of them loads its own copy of the model tables.
+warm_errors = {}
+
+def warm_models():
+    for model_name in hrm.VALID_MODEL_DESCRIPTIONS:
+        try:
+            hrm.REGISTRY.warm([model_name])
+        except Exception as exc:
+            warm_errors[model_name] = repr(exc)
+            app.logger.exception('failed to load model %s', model_name)
+
+warm_thread = threading.Thread(target=warm_models, name='warm_models')
+warm_thread.daemon = True
+warm_thread.start()
+
+
 
 @app.errorhandler(404)
 def not_found(error):
@@ -21,6 +43,22 @@ def home():
     return jsonify({'message': 'hello'})
 
 
+@app.route(base_route + '/ready', methods=['GET'])
+def ready():
+    # ready only once every model's tables are loaded
+    models = {
+        model_name: hrm.REGISTRY.is_loaded(model_name)
+        for model_name in hrm.VALID_MODEL_DESCRIPTIONS}
+    is_ready = all(models.values())
+    body = {
+        'ready': is_ready,
+        'models': models,
+        'errors': warm_errors,
+        'load_times': hrm.REGISTRY.timings(),
+    }
+    return make_response(jsonify(body), 200 if is_ready else 503)
+
+
 @app.route(base_route + '/models', methods=['GET'])
 def list_models():
     return jsonify(hrm.VALID_MODEL_DESCRIPTIONS)
@@ -32,12 +70,7 @@ def describe_model(model_name):
     if model_name not in hrm.VALID_MODEL_DESCRIPTIONS:
         abort(404)
 
-    if model_name == 'V2216_79_O2':
-        from hcc_risk_models.v2216_79_O2 import risk_model
-        model = risk_model.V2216_79_O2()
-    elif model_name == 'V2217_79_O1':
-        from hcc_risk_models.v2217_79_O1 import risk_model
-        model = risk_model.V2217_79_O1()
+    model = hrm.get_model(model_name)
 
     description = model.return_model_description()
     return jsonify(description)
@@ -49,14 +82,10 @@ def evaluate_model(model_name):
     if model_name not in hrm.VALID_MODEL_DESCRIPTIONS:
         abort(404)
 
-    if model_name == 'V2216_79_O2':
-        from hcc_risk_models.v2216_79_O2 import risk_model
-        model = risk_model.V2216_79_O2()
-    elif model_name == 'V2217_79_O1':
-        from hcc_risk_models.v2217_79_O1 import risk_model
-        model = risk_model.V2217_79_O1()
+    model = hrm.get_model(model_name)
 
     demographics, diagnoses = model.input_json_to_dataframes(request.json)
-    result = model.evaluate_risk(demographics, diagnoses)
+    # the model encodes the result itself, send the bytes as they are
+    result = model.evaluate_risk(demographics, diagnoses, as_json=True)
 
-    return jsonify(result)
+    return Response(result, mimetype='application/json')
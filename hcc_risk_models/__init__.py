@@ -1,2 +1,4 @@
 from hcc_risk_models.main import VALID_MODEL_DESCRIPTIONS
 from hcc_risk_models.main import evaluate_model
+from hcc_risk_models.registry import REGISTRY
+from hcc_risk_models.registry import get_model
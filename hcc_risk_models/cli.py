@@ -0,0 +1,208 @@
+"""
+Command line batch scorer, installed as the `hcc-score` console script,
+
+    hcc-score V2217_79_O1 demographics.csv diagnoses.parquet \\
+        --date-asof 2017-02-01 --workers 8 --memory-budget 4GB \\
+        --format csv -o scores.csv
+
+Inputs may be CSV, Parquet or NDJSON files (chosen by file extension).
+Results are written chunk by chunk, so the input files can be larger than
+memory.  When the run finishes, throughput, the number of distinct risk
+profiles scored, the diagnosis mapping cache hits and misses and peak
+memory are printed to stderr.
+"""
+import argparse
+import datetime
+import json
+import sys
+import time
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+from hcc_risk_models import main as hrm_main
+from hcc_risk_models import registry
+from hcc_risk_models.common import results
+from hcc_risk_models.common import streaming
+
+
+#: output formats of the CLI
+OUTPUT_FORMATS = ['ndjson', 'csv']
+
+
+def parse_size(size):
+    """Parse a size such as '512MB' or '2G' into bytes"""
+    units = {'K': 2**10, 'M': 2**20, 'G': 2**30, 'T': 2**40}
+    size = size.strip().upper().rstrip('B')
+    if size and size[-1] in units:
+        return int(float(size[:-1]) * units[size[-1]])
+    return int(size)
+
+
+def peak_memory():
+    """Return the peak resident memory in bytes of this process and the
+    largest peak of its child processes that have been waited for (or None
+    if it can not be measured)"""
+    if resource is None:
+        return None
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    scale = 1 if sys.platform == 'darwin' else 1024
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale
+    return own, children
+
+
+class RowCounter:
+    """Count the rows of DataFrame chunks or records passing through"""
+
+    def __init__(self):
+        self.n_rows = 0
+
+    def chunks(self, chunks):
+        for chunk in chunks:
+            self.n_rows += len(chunk)
+            yield chunk
+
+    def records(self, records):
+        for record in records:
+            self.n_rows += 1
+            yield record
+
+
+class ResultWriter:
+    """Write chunk results as NDJSON patient objects or CSV score rows"""
+
+    def __init__(self, fp, output_format):
+        self.fp = fp
+        self.output_format = output_format
+        self.n_patients = 0
+
+    def write(self, result):
+        if self.output_format == 'csv':
+            scores = result['scores']
+            scores.to_csv(self.fp, header=self.n_patients == 0)
+            self.n_patients += len(scores)
+        else:
+            for patient in result['patients']:
+                self.fp.write(json.dumps(patient, cls=results.ResultEncoder))
+                self.fp.write('\n')
+            self.n_patients += len(result['patients'])
+
+
+def main(argv=None):
+    """Entry point of the hcc-score console script"""
+    parser = argparse.ArgumentParser(
+        prog='hcc-score',
+        description='Evaluate an HCC risk model on files of demographics and '
+                    'diagnoses (CSV, Parquet or NDJSON).')
+    parser.add_argument('model', choices=sorted(registry.MODEL_CLASSES))
+    parser.add_argument('demographics', help='demographics file, one row per person')
+    parser.add_argument('diagnoses', help='diagnoses file, one row per diagnosis')
+    parser.add_argument('-o', '--output', default='-',
+                        help='output file (default: stdout)')
+    parser.add_argument('--format', default='ndjson', choices=OUTPUT_FORMATS,
+                        help='ndjson: one JSON patient object per line, '
+                             'csv: one row of segment scores per patient')
+    parser.add_argument('--date-asof', default=None,
+                        help='date at which ages are computed (YYYY-MM-DD)')
+    parser.add_argument('--sedits', action='store_true',
+                        help='apply the MCE age/sex edits')
+    parser.add_argument('--verbosity', default='full',
+                        choices=results.VERBOSITY_LEVELS,
+                        help='detail of the ndjson patient objects')
+    parser.add_argument('--workers', default=1, type=int,
+                        help='processes used to score each chunk')
+    parser.add_argument('--memory-budget', default='512MB', type=parse_size,
+                        help='memory budget for scoring one chunk (e.g. 512MB, '
+                             '2GB); chunks are sized from their estimated '
+                             'working set, peak RSS is not enforced')
+    parser.add_argument('--chunksize', default=streaming.DEFAULT_CHUNKSIZE, type=int,
+                        help='rows read from an input file at a time')
+    parser.add_argument('--tmpdir', default=None,
+                        help='directory for temporary partition files')
+    parser.add_argument('--sorted', action='store_true',
+                        help='both files are sorted by pt_id as strings (e.g. 1, '
+                             '10, 2); merge-join them in one pass instead of '
+                             'partitioning')
+    parser.add_argument('--numeric-ids', action='store_true',
+                        help='with --sorted, the files are sorted by pt_id as '
+                             'numbers (e.g. 1, 2, 10)')
+    parser.add_argument('--batch-size', default=streaming.DEFAULT_BATCH_SIZE, type=int,
+                        help='patients scored at a time with --sorted')
+    args = parser.parse_args(argv)
+    if args.numeric_ids and not args.sorted:
+        parser.error('--numeric-ids requires --sorted')
+
+    date_asof = None
+    if args.date_asof is not None:
+        date_asof = datetime.datetime.strptime(args.date_asof, '%Y-%m-%d').date()
+
+    output = 'frame' if args.format == 'csv' else 'dict'
+    demo_counter = RowCounter()
+    diag_counter = RowCounter()
+
+    model = registry.get_model(args.model)
+    profile_counts = model.profile_counts
+    people_start, profiles_start = profile_counts.totals()
+    cache_start = model.icd_cache.info()
+
+    time_start = time.time()
+    if args.sorted:
+        chunks = hrm_main.evaluate_model_sorted(
+            args.model,
+            demo_counter.records(streaming.iter_records(args.demographics, args.chunksize)),
+            diag_counter.records(streaming.iter_records(args.diagnoses, args.chunksize)),
+            do_sedits=args.sedits, date_asof=date_asof, output=output,
+            verbosity=args.verbosity, batch_size=args.batch_size,
+            workers=args.workers, key=int if args.numeric_ids else None)
+    else:
+        chunks = hrm_main.evaluate_model_stream(
+            args.model,
+            demo_counter.chunks(streaming.read_chunks(args.demographics, args.chunksize)),
+            diag_counter.chunks(streaming.read_chunks(args.diagnoses, args.chunksize)),
+            do_sedits=args.sedits, date_asof=date_asof, output=output,
+            verbosity=args.verbosity, memory_budget=args.memory_budget,
+            chunksize=args.chunksize, tmpdir=args.tmpdir, workers=args.workers)
+
+    fp = sys.stdout if args.output == '-' else open(args.output, 'w')
+    writer = ResultWriter(fp, args.format)
+    try:
+        for result in chunks:
+            writer.write(result)
+    finally:
+        if fp is not sys.stdout:
+            fp.close()
+    elapsed = max(time.time() - time_start, 1e-9)
+
+    n_rows = demo_counter.n_rows + diag_counter.n_rows
+    sys.stderr.write(
+        'scored {} patients ({} input rows) in {:.1f}s: '
+        '{:.0f} patients/sec, {:.0f} rows/sec\n'.format(
+            writer.n_patients, n_rows, elapsed,
+            writer.n_patients / elapsed, n_rows / elapsed))
+    n_people, n_profiles = profile_counts.totals()
+    n_people -= people_start
+    n_profiles -= profiles_start
+    sys.stderr.write(
+        'distinct risk profiles: {} ({:.1f} patients per profile)\n'.format(
+            n_profiles, n_people / n_profiles if n_profiles else 1.0))
+    cache_info = model.icd_cache.info()
+    sys.stderr.write(
+        'diagnosis mapping cache: {} hits, {} misses\n'.format(
+            cache_info['hits'] - cache_start['hits'],
+            cache_info['misses'] - cache_start['misses']))
+    memory = peak_memory()
+    if memory is not None:
+        sys.stderr.write('peak memory: {:.1f} MB\n'.format(memory[0] / 2.0**20))
+        # RUSAGE_CHILDREN only covers children that have exited and been
+        # waited for (here the worker pools), so this is not a live figure
+        if args.workers > 1:
+            sys.stderr.write(
+                'peak memory of the largest exited worker process: {:.1f} MB\n'
+                .format(memory[1] / 2.0**20))
+
+
+if __name__ == '__main__':
+    main()
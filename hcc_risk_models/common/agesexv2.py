@@ -29,9 +29,16 @@ Outputs:
       create_necell - 32 dummy agesex variables for "new enrollee"
                       models (NE_AGESEXV)
 
+    Each function has a vectorized counterpart (create_disabl_array, ...)
+    that takes NumPy arrays holding a whole population and returns arrays
+    (or indicator matrices with one row per patient and one column per
+    dummy variable).
+
 """
 import re
 
+import numpy
+
 AGESEXV = [
     'F0_34',  'F35_44', 'F45_54', 'F55_59', 'F60_64', 'F65_69',
     'F70_74', 'F75_79', 'F80_84', 'F85_89', 'F90_94', 'F95_GT',
@@ -86,6 +93,54 @@ def _parse_agesex_var(x):
     return sex, int(age_lo), int(age_hi)
 
 
+def _build_cell_table(varnames):
+    """Return a (sex, age) -> column index lookup table for `varnames`.
+
+    Args:
+      varnames (list): agesex dummy variable names (AGESEXV or NE_AGESEXV)
+
+    Returns:
+      table (numpy.ndarray): shape (3, MAX_AGE + 1).  table[sex, age] is the
+                             index in `varnames` of the dummy variable that
+                             matches sex and (integer) age, -1 if none does
+    """
+    table = numpy.full((3, MAX_AGE + 1), -1, dtype=numpy.int16)
+    for ivar, varname in enumerate(varnames):
+        sex, age_lo, age_hi = _parse_agesex_var(varname)
+        table[sex, age_lo:age_hi + 1] = ivar
+    return table
+
+
+#: (sex, age) -> index in AGESEXV / NE_AGESEXV
+CELL_TABLE = _build_cell_table(AGESEXV)
+NECELL_TABLE = _build_cell_table(NE_AGESEXV)
+
+
+def _lookup_cell(table, varnames, age, sex):
+    """Return a dict with the dummy variable matching age and sex set to 1"""
+    cell = dict.fromkeys(varnames, 0)
+    if sex in (1, 2) and 0 <= age <= MAX_AGE and int(age) == age:
+        ivar = table[sex, int(age)]
+        if ivar >= 0:
+            cell[varnames[ivar]] = 1
+    return cell
+
+
+def _lookup_cell_array(table, varnames, ages, sexes):
+    """Return an (n_patients, n_vars) 0/1 indicator matrix"""
+    ages = numpy.asarray(ages)
+    sexes = numpy.asarray(sexes)
+    cells = numpy.zeros((ages.shape[0], len(varnames)), dtype=numpy.int8)
+    valid = (
+        ((sexes == 1) | (sexes == 2)) &
+        (ages >= 0) & (ages <= MAX_AGE) & (numpy.floor(ages) == ages))
+    rows = numpy.flatnonzero(valid)
+    cols = table[sexes[rows].astype(numpy.intp), ages[rows].astype(numpy.intp)]
+    matched = cols >= 0
+    cells[rows[matched], cols[matched]] = 1
+    return cells
+
+
 def create_cell(age, sex):
     """Create demographic variables for non "new enrollee" models (i.e. the
     dummy variables in AGESEXV)
@@ -98,12 +153,7 @@ def create_cell(age, sex):
       cell (dict): keys are elements of AGESEXV.  all values = 0 except
                    the agesex dummy variable that matches the patient input
     """
-    cell = {varname: 0 for varname in AGESEXV}
-    for varname in AGESEXV:
-        dummy_sex, dummy_age_lo, dummy_age_hi = _parse_agesex_var(varname)
-        if sex == dummy_sex and dummy_age_lo <= age <= dummy_age_hi:
-            cell[varname] = 1
-    return cell
+    return _lookup_cell(CELL_TABLE, AGESEXV, age, sex)
 
 
 def create_necell(age, sex):
@@ -118,12 +168,35 @@ def create_necell(age, sex):
       necell (dict): keys are elements of NE_AGESEXV.  all values = 0 except
                      the agesex dummy variable that matches the patient input
     """
-    necell = {varname: 0 for varname in NE_AGESEXV}
-    for varname in NE_AGESEXV:
-        dummy_sex, dummy_age_lo, dummy_age_hi = _parse_agesex_var(varname)
-        if sex == dummy_sex and dummy_age_lo <= age <= dummy_age_hi:
-            necell[varname] = 1
-    return necell
+    return _lookup_cell(NECELL_TABLE, NE_AGESEXV, age, sex)
+
+
+def create_cell_array(ages, sexes):
+    """Vectorized create_cell
+
+    Args:
+      ages (numpy.ndarray): patient ages in years
+      sexes (numpy.ndarray): male=1, female=2
+
+    Returns:
+      cells (numpy.ndarray): shape (n_patients, len(AGESEXV)) 0/1 matrix,
+                             columns in AGESEXV order
+    """
+    return _lookup_cell_array(CELL_TABLE, AGESEXV, ages, sexes)
+
+
+def create_necell_array(ages, sexes):
+    """Vectorized create_necell
+
+    Args:
+      ages (numpy.ndarray): patient ages in years
+      sexes (numpy.ndarray): male=1, female=2
+
+    Returns:
+      necells (numpy.ndarray): shape (n_patients, len(NE_AGESEXV)) 0/1
+                               matrix, columns in NE_AGESEXV order
+    """
+    return _lookup_cell_array(NECELL_TABLE, NE_AGESEXV, ages, sexes)
 
 
 def create_disabl(age, orec):
@@ -157,6 +230,37 @@ def create_origds(disabl, orec):
     return origds
 
 
+def create_disabl_array(ages, orecs):
+    """Vectorized create_disabl
+
+    Args:
+      ages (numpy.ndarray): patient ages in years
+      orecs (numpy.ndarray): original reason for entitlement codes
+
+    Returns:
+      disabl (numpy.ndarray): disabled dummy variables (0 or 1)
+    """
+    ages = numpy.asarray(ages)
+    orecs = numpy.asarray(orecs)
+    return ((ages < 65) & (orecs != 0)).astype(numpy.int8)
+
+
+def create_origds_array(disabl, orecs):
+    """Vectorized create_origds
+
+    Args:
+      disabl (numpy.ndarray): disabled dummy variables (from
+                              create_disabl_array)
+      orecs (numpy.ndarray): original reason for entitlement codes
+
+    Returns:
+      origds (numpy.ndarray): originally disabled dummy variables (0 or 1)
+    """
+    disabl = numpy.asarray(disabl).astype(int)
+    orecs = numpy.asarray(orecs).astype(int)
+    return ((orecs == 1) & (disabl == 0)).astype(numpy.int8)
+
+
 if __name__ == '__main__':
 
     age = 63
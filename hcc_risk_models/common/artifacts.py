@@ -0,0 +1,268 @@
+"""
+Compiled binary artifacts of the model data files.
+
+Parsing the SAS formats and coefficient CSV files with pandas takes far
+longer than using the lookup tables compiled from them.  The compiled
+tables are therefore saved as NumPy arrays in an `.npz` artifact and later
+loads read the artifact instead of the CSV,
+
+    arrays = load_or_build(FORMATS_FILE, 'formats', 1, build_arrays)
+
+Artifacts are content addressed: the file name holds the artifact kind,
+its version and the SHA-256 of the source file, and the same information
+is stored in a JSON header inside the artifact.  Editing a source file (or
+bumping the version when the compiled layout changes) therefore leads to a
+new artifact being built automatically on the next load.
+
+Artifacts are written to `HCC_RISK_MODELS_CACHE` if set, otherwise to
+~/.cache/hcc_risk_models.  If that directory is not writable the tables
+are compiled in memory on every load, as before.
+
+Arrays are stored uncompressed and aligned, and are memory-mapped
+read-only from the artifact rather than read into memory, so the worker
+processes of a multi-process deployment that load the same artifact share
+a single physical copy of the tables through the page cache.
+
+To build every artifact ahead of time (e.g. in a container image) run
+
+    python -m hcc_risk_models.common.artifacts
+
+"""
+import hashlib
+import io
+import json
+import os
+import struct
+import tempfile
+import time
+import zipfile
+
+import numpy
+
+from hcc_risk_models.common import flat
+
+
+#: name of the header entry in every artifact
+HEADER_KEY = '__header__'
+
+
+def cache_dir():
+    """Return the directory artifacts are written to"""
+    path = os.environ.get('HCC_RISK_MODELS_CACHE')
+    if not path:
+        path = os.path.join(os.path.expanduser('~'), '.cache', 'hcc_risk_models')
+    return path
+
+
+#: zip local file header (see the .ZIP file format specification)
+ZIP_LOCAL_HEADER = struct.Struct('<4s5H3L2H')
+
+#: array data in an artifact starts at a multiple of this many bytes
+ALIGNMENT = 64
+
+#: id of the zip extra field used to pad members to ALIGNMENT
+PADDING_EXTRA_ID = 0xa1a1
+
+
+#: (path, size, mtime) -> SHA-256 of files already hashed
+_file_digests = {}
+
+
+def file_sha256(path):
+    """Return the hex SHA-256 digest of the file at `path` (remembered
+    until the file's size or modification time changes)"""
+    stat = os.stat(path)
+    stat_key = (os.path.realpath(path), stat.st_size, stat.st_mtime_ns)
+    sha256 = _file_digests.get(stat_key)
+    if sha256 is None:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as fp:
+            for block in iter(lambda: fp.read(2**20), b''):
+                digest.update(block)
+        sha256 = digest.hexdigest()
+        _file_digests[stat_key] = sha256
+    return sha256
+
+
+def sources_sha256(sources):
+    """Return the hex SHA-256 digest of one source path or a list of them"""
+    if isinstance(sources, str):
+        return file_sha256(sources)
+    digest = hashlib.sha256()
+    for source in sources:
+        digest.update(file_sha256(source).encode('ascii'))
+    return digest.hexdigest()
+
+
+def artifact_path(source, kind, version, sha256, directory=None):
+    """Return the path of the artifact compiled from `source` (a path or a
+    list of paths)"""
+    if directory is None:
+        directory = cache_dir()
+    if not isinstance(source, str):
+        source = source[0]
+    basename = os.path.splitext(os.path.basename(source))[0]
+    fname = '{}-{}-v{}-{}.npz'.format(kind, basename, version, sha256[:16])
+    return os.path.join(directory, fname)
+
+
+def _write_npz(fp, entries):
+    """Write an uncompressed .npz (readable by numpy.load) in which the data
+    of every array starts at a multiple of ALIGNMENT bytes, so the arrays
+    can be memory-mapped in place"""
+    with zipfile.ZipFile(fp, mode='w', compression=zipfile.ZIP_STORED) as npz:
+        for key, array in entries.items():
+            buffer = io.BytesIO()
+            numpy.lib.format.write_array(buffer, numpy.asanyarray(array),
+                                         allow_pickle=False)
+            info = zipfile.ZipInfo(key + '.npy', date_time=(1980, 1, 1, 0, 0, 0))
+            info.compress_type = zipfile.ZIP_STORED
+            info.external_attr = 0o644 << 16
+            # .npy headers are padded to 64 bytes, so aligning the start of
+            # the .npy member aligns the array data
+            data_offset = fp.tell() + ZIP_LOCAL_HEADER.size + len(info.filename) + 4
+            padding = -data_offset % ALIGNMENT
+            info.extra = struct.pack('<2H', PADDING_EXTRA_ID, padding) + b'\0' * padding
+            npz.writestr(info, buffer.getvalue())
+
+
+def write_artifact(path, arrays, header):
+    """Atomically write `arrays` and a JSON `header` to an .npz file"""
+    directory = os.path.dirname(path)
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.npz.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as fp:
+            entries = dict(arrays)
+            entries[HEADER_KEY] = numpy.array(json.dumps(header, sort_keys=True))
+            _write_npz(fp, entries)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _map_member(path, fp, info):
+    """Return a read-only memory map of one uncompressed .npy zip member"""
+    fp.seek(info.header_offset)
+    fields = ZIP_LOCAL_HEADER.unpack(fp.read(ZIP_LOCAL_HEADER.size))
+    if fields[0] != b'PK\x03\x04':
+        raise ValueError('bad zip local header in {}'.format(path))
+    fp.seek(info.header_offset + ZIP_LOCAL_HEADER.size + fields[9] + fields[10])
+
+    npy_version = numpy.lib.format.read_magic(fp)
+    if npy_version == (1, 0):
+        shape, fortran_order, dtype = numpy.lib.format.read_array_header_1_0(fp)
+    else:
+        shape, fortran_order, dtype = numpy.lib.format.read_array_header_2_0(fp)
+    if dtype.hasobject:
+        raise ValueError('object arrays can not be memory-mapped')
+    if not shape or 0 in shape:
+        # mmap can not map zero bytes; tiny arrays are read instead
+        count = int(numpy.prod(shape))
+        array = numpy.fromfile(fp, dtype=dtype, count=count)
+        return array.reshape(shape, order='F' if fortran_order else 'C')
+    offset = fp.tell()
+    mapped = numpy.memmap(path, dtype=dtype, mode='r', offset=offset, shape=shape,
+                          order='F' if fortran_order else 'C')
+    if offset % dtype.alignment:
+        # not written by write_artifact; an unaligned map would be slow
+        return numpy.array(mapped)
+    # a plain ndarray view of the map avoids the memmap subclass overhead
+    # on every (scalar) access
+    return mapped.view(numpy.ndarray)
+
+
+def read_artifact(path, mmap=True):
+    """Return (arrays, header) read from an .npz artifact
+
+    With `mmap` the arrays are read-only memory maps of the artifact file,
+    otherwise they are read into memory.
+    """
+    if not mmap:
+        with numpy.load(path, allow_pickle=False) as npz:
+            arrays = {key: npz[key] for key in npz.files if key != HEADER_KEY}
+            header = json.loads(str(npz[HEADER_KEY]))
+        return arrays, header
+
+    arrays = {}
+    with zipfile.ZipFile(path) as npz, open(path, 'rb') as fp:
+        for info in npz.infolist():
+            if info.compress_type != zipfile.ZIP_STORED:
+                raise ValueError('compressed artifact member {}'.format(info.filename))
+            key = info.filename[:-len('.npy')]
+            arrays[key] = _map_member(path, fp, info)
+    header = json.loads(str(arrays.pop(HEADER_KEY)[()]))
+    return arrays, header
+
+
+def load_or_build(source, kind, version, build, directory=None):
+    """Return the compiled arrays for `source`, building the artifact if needed
+
+    Args:
+      source (str or list): path of the source data file (or files)
+      kind (str): artifact kind (e.g. 'formats', 'coefficients')
+      version (int): layout version of the compiled arrays
+      build (callable): called with no arguments, returns {name: array}
+                        compiled from `source`
+      directory (str): artifact directory (default cache_dir())
+
+    Returns:
+      arrays (dict): name -> numpy.ndarray (read-only memory maps of the
+                     artifact unless it could not be written)
+    """
+    sha256 = sources_sha256(source)
+    path = artifact_path(source, kind, version, sha256, directory)
+
+    if os.path.exists(path):
+        try:
+            arrays, header = read_artifact(path)
+        except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+            pass  # unreadable artifact, build it again
+        else:
+            if header.get('source_sha256') == sha256 and header.get('version') == version:
+                return arrays
+
+    arrays = build()
+    header = {
+        'kind': kind,
+        'version': version,
+        'source': (os.path.basename(source) if isinstance(source, str)
+                   else [os.path.basename(path) for path in source]),
+        'source_sha256': sha256,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+    }
+    try:
+        write_artifact(path, arrays, header)
+    except OSError:
+        return arrays  # read-only cache directory, use the arrays compiled in memory
+    return read_artifact(path)[0]
+
+
+def add_lookup(arrays, name, lookup):
+    """Store a {str: int or tuple of ints} dict as two arrays (sorted by key)
+    in `arrays`"""
+    arrays[name + '_keys'], arrays[name + '_values'] = flat.sorted_lookup_arrays(lookup)
+
+
+def get_lookup(arrays, name):
+    """Return the lookup stored with add_lookup as a flat.ArrayLookup (a
+    read-only mapping that returns tuples for rows of 2D values)"""
+    return flat.ArrayLookup(arrays[name + '_keys'], arrays[name + '_values'])
+
+
+if __name__ == '__main__':
+
+    # build the artifacts of every model
+    from hcc_risk_models import registry
+    for name in sorted(registry.MODEL_CLASSES):
+        model_class = registry.REGISTRY.get_model_class(name)
+        model_class.FORMATS
+        model_class.COEFFICIENTS
+        for table in ('ICD9_DEFS', 'ICD10_DEFS'):
+            if hasattr(model_class, table):
+                getattr(model_class, table)
+        print('{}: artifacts in {}'.format(name, cache_dir()))
@@ -3,8 +3,11 @@ Handles regression coefficients.
 """
 
 import os
+import numpy
 import pandas
 
+from hcc_risk_models.common import artifacts
+
 
 DESCRIPTIONS = {
     'C2110H2R': 'coefficients for 3 regression models developed using CY2006/2007 data and CMS denominator 8,034.71 (1/18/2010)',
@@ -20,6 +23,17 @@ DENOMINATORS = {
     'C2214O5P': 9185.29,
 }
 
+#: layout version of the compiled coefficients artifact
+ARTIFACT_VERSION = 1
+
+
+def build_arrays(fname):
+    """Read a coefficients CSV and return its names and values as arrays"""
+    df = pandas.read_csv(fname).loc[0]
+    return {
+        'names': numpy.array(df.index.tolist(), dtype=str),
+        'values': df.to_numpy(dtype=numpy.float64),
+    }
 
 
 class Coefficients:
@@ -28,13 +42,54 @@ class Coefficients:
         # get coefficients label
         label = os.path.split(fname)[-1].split('.')[0]
 
-        # put the coefficients into a pandas Series
-        df = pandas.read_csv(fname).loc[0]
-        self.df = df
+        # put the coefficients into a pandas Series over the values
+        # memory-mapped from the compiled artifact (the CSV is only parsed
+        # if the artifact is missing or out of date)
+        arrays = artifacts.load_or_build(
+            fname, 'coefficients', ARTIFACT_VERSION, lambda: build_arrays(fname))
+        self.set_values(arrays['names'].tolist(), arrays['values'])
 
         self.cms_denominator = DENOMINATORS[label]
         self.description = DESCRIPTIONS[label]
 
+    @classmethod
+    def from_dict(cls, coefficients):
+        """Return Coefficients holding a {"<segment>_<variable>": value} dict"""
+        self = cls.__new__(cls)
+        self.set_values(list(coefficients), numpy.array(list(coefficients.values())))
+        self.cms_denominator = None
+        self.description = None
+        return self
+
+    def set_values(self, names, values):
+        """Set the coefficients `values` named "<segment>_<variable>"
+
+        Besides the `df` Series, this builds a dense (segment x variable)
+        `matrix` (NaN where a segment has no coefficient for a variable)
+        with `segment_index` and `variable_index` mapping names to rows and
+        columns.
+        """
+        self.df = pandas.Series(values, index=names, copy=False)
+
+        self.segments = []
+        self.segment_index = {}
+        self.variables = []
+        self.variable_index = {}
+        rows = numpy.empty(len(names), dtype=numpy.int64)
+        cols = numpy.empty(len(names), dtype=numpy.int64)
+        for iname, name in enumerate(names):
+            segment, variable = name.split('_', 1)
+            if segment not in self.segment_index:
+                self.segment_index[segment] = len(self.segments)
+                self.segments.append(segment)
+            if variable not in self.variable_index:
+                self.variable_index[variable] = len(self.variables)
+                self.variables.append(variable)
+            rows[iname] = self.segment_index[segment]
+            cols[iname] = self.variable_index[variable]
+        self.matrix = numpy.full((len(self.segments), len(self.variables)), numpy.nan)
+        self.matrix[rows, cols] = values
+
     def __getitem__(self, key):
         return self.df[key]
 
@@ -0,0 +1,94 @@
+"""
+Vectorized date of birth parsing and age calculation.
+
+Dates of birth are split into year, month and day integer arrays so the
+age of a whole population can be computed in one pass,
+
+    years, months, days = parse_dates(demographics['dob'])
+    ages = age_asof(years, months, days, datetime.date(2017, 2, 1))
+
+Ages match `relativedelta(date_asof, dob).years` exactly, including the
+way it handles people born on February 29th (their birthday falls on
+February 28th in non-leap years).
+"""
+import datetime
+import re
+
+import numpy
+import pandas
+
+
+#: fast path for "year-month-day" strings (e.g. "1930-8-21", "1930-08-21")
+DATE_PATTERN = re.compile(r'^\s*(\d{4})-(\d{1,2})-(\d{1,2})\s*$')
+
+
+def _parse_date(value):
+    """Return (year, month, day) for a date string or date-like object"""
+    if isinstance(value, str):
+        m = DATE_PATTERN.match(value)
+        if m:
+            date = datetime.date(int(m.group(1)), int(m.group(2)), int(m.group(3)))
+            return date.year, date.month, date.day
+    date = pandas.to_datetime(value)
+    return date.year, date.month, date.day
+
+
+def parse_dates(values):
+    """Parse dates into year, month and day arrays
+
+    Each distinct value is parsed once, so repeated dates (common for dates
+    of birth in large populations) cost a single parse.  Strings in
+    "year-month-day" form are parsed without going through pandas.
+
+    Args:
+      values (iterable): date strings or date-like objects
+
+    Returns:
+      years, months, days (numpy.ndarray): integer arrays, one entry per value
+    """
+    codes, uniques = pandas.factorize(pandas.Series(values, dtype=object))
+    if (codes < 0).any():
+        raise ValueError('dates must not be missing')
+    parsed = numpy.array(
+        [_parse_date(value) for value in uniques], dtype=numpy.int64
+    ).reshape(-1, 3)[codes]
+    return parsed[:, 0], parsed[:, 1], parsed[:, 2]
+
+
+def days_in_month(years, months):
+    """Return the number of days in each (year, month)"""
+    years = numpy.asarray(years)
+    months = numpy.asarray(months)
+    days = numpy.array([0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])[months]
+    leap = (years % 4 == 0) & ((years % 100 != 0) | (years % 400 == 0))
+    return days + ((months == 2) & leap)
+
+
+def age_asof(years, months, days, date_asof):
+    """Return whole years between each date of birth and `date_asof`
+
+    Args:
+      years, months, days (numpy.ndarray): dates of birth (from parse_dates)
+      date_asof (date or datetime): date at which ages are computed
+
+    Returns:
+      ages (numpy.ndarray): same as relativedelta(date_asof, dob).years
+    """
+    years = numpy.asarray(years)
+    months = numpy.asarray(months)
+    days = numpy.asarray(days)
+
+    # birthday in the year of date_asof (Feb. 29th -> Feb. 28th if needed)
+    bday_days = numpy.minimum(days, days_in_month(date_asof.year, months))
+    before_bday = (date_asof.month < months) | (
+        (date_asof.month == months) & (date_asof.day < bday_days))
+    # a date_asof with a time of day is later than a birthday at midnight
+    past_midnight = (isinstance(date_asof, datetime.datetime) and
+                     date_asof.time() != datetime.time(0))
+    after_bday = (date_asof.month > months) | (
+        (date_asof.month == months) & (date_asof.day > bday_days - past_midnight))
+
+    ages = date_asof.year - years
+    # relativedelta truncates towards zero for dates of birth after date_asof
+    return numpy.where(ages > 0, ages - before_bday,
+                       numpy.where(ages < 0, ages + after_bday, 0))
@@ -0,0 +1,90 @@
+"""
+Demographic predictors and scores of every demographic cell, precomputed.
+
+A person's demographic predictors (age/sex cells, Medicaid, originally
+disabled and the new enrollee interactions) depend only on (age, sex,
+orec, medicaid, nemcaid), and those take few enough values to enumerate:
+121 ages x 2 sexes x 4 orecs x 2 x 2 = 3872 cells.  `DemographicTable`
+evaluates a model's create_demographic_predictors once per cell when the
+model is loaded, so the demographics of a person are a table lookup,
+
+    table = DemographicTable(model.create_demographic_predictors,
+                             model.SEGMENT_COEFFICIENTS)
+    icells = table.cells(ages, sexes, orecs, medicaids, nemcaids)  # -1 outside it
+    table.scores[icells]   # (n_people, n_segments) demographic scores
+    table.disabl[icells]   # disabled flags
+    table.columns[icell]   # flagged demographic predictor columns of one cell
+
+The originally disabled flag and its interactions are demographic
+predictors, so they are part of each cell's columns and scores.
+
+"""
+import itertools
+
+import numpy
+
+from hcc_risk_models.common import scoring
+
+
+#: oldest age in the table (older people are scored without it)
+MAX_AGE = 120
+
+SEXES = [1, 2]
+ORECS = [0, 1, 2, 3]
+MEDICAID = [0, 1]
+NEMCAID = [0, 1]
+
+
+class DemographicTable:
+    """Demographic predictors, scores and disabled flag of every demographic cell
+
+    Args:
+      create_demographic_predictors (callable): called as
+          f(agef, sex, orec, medicaid, nemcaid), returns (preds, disabl)
+      segment_coefficients (SegmentCoefficients): defines the predictor
+                                                  columns and segments
+
+    Attributes:
+      columns (list): sorted flagged predictor columns of each cell
+      scores (numpy.ndarray): (cell x segment) demographic scores
+      disabl (numpy.ndarray): disabled flag of each cell
+    """
+
+    shape = (MAX_AGE + 1, len(SEXES), len(ORECS), len(MEDICAID), len(NEMCAID))
+
+    def __init__(self, create_demographic_predictors, segment_coefficients):
+        n_cells = int(numpy.prod(self.shape))
+        self.columns = []
+        self.disabl = numpy.zeros(n_cells, dtype=numpy.int8)
+        indicators = scoring.PredictorIndicators(segment_coefficients)
+        # cells in index order (the last dimension varies fastest)
+        cells = itertools.product(range(MAX_AGE + 1), SEXES, ORECS, MEDICAID, NEMCAID)
+        for icell, (age, sex, orec, medicaid, nemcaid) in enumerate(cells):
+            preds, disabl = create_demographic_predictors(age, sex, orec, medicaid, nemcaid)
+            cols, = indicators.add_person(preds)
+            self.columns.append(cols)
+            self.disabl[icell] = disabl
+
+        # scored like any other indicator rows, so the demographic score of
+        # a person without diagnoses is exactly their segment score
+        self.scores = segment_coefficients.score(indicators)
+
+    def cell(self, agef, sex, orec, medicaid, nemcaid):
+        """Return the cell index of one person (-1 if any value is outside
+        the table)"""
+        if not (0 <= agef <= MAX_AGE and sex in (1, 2) and 0 <= orec <= 3 and
+                medicaid in (0, 1) and nemcaid in (0, 1)):
+            return -1
+        return (((agef * 2 + sex - 1) * 4 + orec) * 2 + medicaid) * 2 + nemcaid
+
+    def cells(self, ages, sexes, orecs, medicaids, nemcaids):
+        """Vectorized cell (-1 where a value is outside the table)"""
+        values = [numpy.asarray(ages), numpy.asarray(sexes) - 1, numpy.asarray(orecs),
+                  numpy.asarray(medicaids), numpy.asarray(nemcaids)]
+        inside = numpy.ones(len(values[0]), dtype=bool)
+        for value, size in zip(values, self.shape):
+            inside &= (value >= 0) & (value < size)
+        icells = numpy.full(len(inside), -1, dtype=numpy.int64)
+        icells[inside] = numpy.ravel_multi_index(
+            [value[inside].astype(numpy.int64) for value in values], self.shape)
+        return icells
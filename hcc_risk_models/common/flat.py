@@ -0,0 +1,236 @@
+"""
+Read-only lookup tables stored in flat NumPy arrays.
+
+The compiled model tables (diagnosis code -> condition category, MCE
+age/sex limits, code descriptions) are kept as a handful of flat arrays
+rather than as dicts or DataFrames of Python objects.  When the arrays are
+memory-mapped from an artifact (see common/artifacts.py) every process on
+a host that loads the same artifact shares one physical copy of them, and
+because they hold no Python objects, reference counting never writes to
+(and so never un-shares) their pages.
+
+    keys, values = sorted_lookup_arrays({'E119': 19, 'I5022': 85})
+    lookup = ArrayLookup(keys, values)
+    lookup.get('E119', -1)
+
+"""
+import bisect
+import collections.abc
+
+import numpy
+import pandas
+
+
+#: keys of up to this many ASCII characters (all ICD codes) are packed
+#: into unsigned 64 bit integers
+PACKED_KEY_BYTES = 8
+
+
+def pack_key(key):
+    """Pack a string of up to 8 ASCII characters into an int that sorts like
+    the string (None for any other key)"""
+    try:
+        data = key.encode('ascii')
+    except (AttributeError, UnicodeEncodeError):
+        return None
+    if len(data) > PACKED_KEY_BYTES or b'\0' in data:
+        return None
+    return int.from_bytes(data.ljust(PACKED_KEY_BYTES, b'\0'), 'big')
+
+
+def unpack_key(packed):
+    """Inverse of pack_key"""
+    return packed.to_bytes(PACKED_KEY_BYTES, 'big').rstrip(b'\0').decode('ascii')
+
+
+def key_array(keys):
+    """Return an array of sorted string keys, packed into uint64 if every key
+    can be packed"""
+    packed = [pack_key(key) for key in keys]
+    if None in packed:
+        return numpy.array(keys, dtype=str)
+    return numpy.array(packed, dtype=numpy.uint64)
+
+
+def sorted_lookup_arrays(lookup):
+    """Return (keys, values) arrays of a {str: int or tuple of ints} dict
+    with the keys sorted, as used by ArrayLookup"""
+    keys = sorted(lookup)
+    values_array = numpy.array([lookup[key] for key in keys], dtype=numpy.int64)
+    return key_array(keys), values_array
+
+
+class ArrayLookup(collections.abc.Mapping):
+    """Read-only mapping over a sorted key array and an aligned value array
+
+    Keys are found by binary search, directly on the buffer of packed
+    (uint64) keys so that no array has to be converted into Python objects.
+    Values are returned as Python ints (or tuples of ints for a 2D value
+    array), so the lookup compares equal to the dict it replaces.
+
+    Args:
+      keys (ndarray): sorted unique keys from key_array
+      values (ndarray): int values, one row per key
+    """
+
+    def __init__(self, keys, values):
+        self.keys_array = keys
+        self.values_array = values
+        self.packed = keys.dtype.kind == 'u'
+        if self.packed:
+            self._keys = memoryview(numpy.ascontiguousarray(keys))
+        if values.ndim == 1:
+            self._values = memoryview(numpy.ascontiguousarray(values))
+
+    def _find(self, key):
+        """Return the position of `key` or -1 if it is missing"""
+        n_keys = len(self.keys_array)
+        if self.packed:
+            packed = pack_key(key)
+            if packed is None:
+                return -1
+            ikey = bisect.bisect_left(self._keys, packed)
+            if ikey < n_keys and self._keys[ikey] == packed:
+                return ikey
+            return -1
+
+        if not isinstance(key, str) or n_keys == 0:
+            return -1
+        ikey = int(numpy.searchsorted(self.keys_array, key))
+        if ikey < n_keys and self.keys_array[ikey] == key:
+            return ikey
+        return -1
+
+    def _value(self, ikey):
+        if self.values_array.ndim == 1:
+            return self._values[ikey]
+        return tuple(self.values_array[ikey].tolist())
+
+    def get(self, key, default=None):
+        ikey = self._find(key)
+        if ikey == -1:
+            return default
+        return self._value(ikey)
+
+    def __getitem__(self, key):
+        ikey = self._find(key)
+        if ikey == -1:
+            raise KeyError(key)
+        return self._value(ikey)
+
+    def __contains__(self, key):
+        return self._find(key) != -1
+
+    def __len__(self):
+        return len(self.keys_array)
+
+    def __iter__(self):
+        return iter(self._key_list())
+
+    def _key_list(self):
+        if self.packed:
+            return [unpack_key(packed) for packed in self.keys_array.tolist()]
+        return self.keys_array.tolist()
+
+    def items(self):
+        values = self.values_array.tolist()
+        if self.values_array.ndim == 2:
+            values = [tuple(value) for value in values]
+        return zip(self._key_list(), values)
+
+
+class StringColumn:
+    """Column of strings stored as one UTF-8 byte array and an offset array
+
+    String `i` is blob[offsets[i]:offsets[i+1]].
+    """
+
+    def __init__(self, blob, offsets):
+        self.blob = blob
+        self.offsets = offsets
+
+    @staticmethod
+    def build_arrays(strings):
+        """Return (blob, offsets) arrays of a sequence of strings"""
+        encoded = [string.encode('utf-8') for string in strings]
+        offsets = numpy.zeros(len(encoded) + 1, dtype=numpy.int64)
+        numpy.cumsum([len(string) for string in encoded], out=offsets[1:])
+        blob = numpy.frombuffer(b''.join(encoded), dtype=numpy.uint8)
+        return blob, offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, irow):
+        start, stop = self.offsets[irow], self.offsets[irow + 1]
+        return self.blob[start:stop].tobytes().decode('utf-8')
+
+    def tolist(self):
+        data = self.blob.tobytes()
+        offsets = self.offsets.tolist()
+        return [data[start:stop].decode('utf-8')
+                for start, stop in zip(offsets[:-1], offsets[1:])]
+
+
+class CodeTable:
+    """Table of rows keyed by code, with string and integer columns
+
+    Rows keep the order of the source file; codes are found through a
+    sorted code -> row lookup.  Build the arrays from a DataFrame indexed by
+    code with `CodeTable.build_arrays(df)`.
+    """
+
+    def __init__(self, arrays):
+        self.codes = arrays['codes']
+        self.rows = ArrayLookup(arrays['sorted_codes'], arrays['sorted_rows'])
+        self.columns = {}
+        for name in arrays['columns'].tolist():
+            if name + '_blob' in arrays:
+                self.columns[name] = StringColumn(
+                    arrays[name + '_blob'], arrays[name + '_offsets'])
+            else:
+                self.columns[name] = arrays[name]
+
+    @staticmethod
+    def build_arrays(df):
+        """Return the arrays of a DataFrame indexed by (unique) code"""
+        codes = numpy.array(df.index.tolist(), dtype=str)
+        order = numpy.argsort(codes, kind='stable')
+        arrays = {
+            'codes': codes,
+            'sorted_codes': key_array(codes[order].tolist()),
+            'sorted_rows': order.astype(numpy.int64),
+            'columns': numpy.array(df.columns.tolist(), dtype=str),
+        }
+        for name in df.columns:
+            column = df[name]
+            if column.dtype.kind in 'iub':
+                arrays[name] = column.to_numpy(dtype=numpy.int64)
+            else:
+                # a missing value is stored as '' (astype(str) would give 'nan')
+                arrays[name + '_blob'], arrays[name + '_offsets'] = \
+                    StringColumn.build_arrays(column.fillna('').astype(str).tolist())
+        return arrays
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __contains__(self, code):
+        return code in self.rows
+
+    def get(self, code, column):
+        """Return one value of the row of `code` (KeyError if missing)"""
+        value = self.columns[column][self.rows[code]]
+        if isinstance(value, numpy.integer):
+            return int(value)
+        return value
+
+    def column_list(self, column):
+        """Return a column as a list of Python values in row order"""
+        return self.columns[column].tolist()
+
+    def to_frame(self):
+        """Return the table as a DataFrame indexed by code"""
+        return pandas.DataFrame(
+            {name: self.column_list(name) for name in self.columns},
+            index=pandas.Index(self.codes.tolist(), name='code'))
@@ -5,6 +5,8 @@ the regression coefficients.
 import os
 import pandas
 
+from hcc_risk_models.common import artifacts
+
 
 PATH_HERE = os.path.realpath(__file__)
 DIR_HERE = os.path.split(PATH_HERE)[0]
@@ -17,22 +19,131 @@ icd10_map_secondary = 'I011722AS3Y16Y17PC'
 age_mce = 'IAGEHYBCY16MCE'
 sex_mce = 'ISEXHYBCY16MCE'
 
+#: condition category assignment tables in the order they are applied
+cc_assignment_tables = {
+    0: [('primary', icd10_map_primary),
+        ('duplicate', icd10_map_duplicate),
+        ('secondary', icd10_map_secondary)],
+}
+
+
+#: SAS CNTLOUT columns the model uses
+CSV_COLUMNS = ['FMTNAME', 'START', 'LABEL']
+
+#: format tables the model uses (the CSV holds other models' tables too)
+FMTNAMES = ['AGEL', 'AGEU', age_mce, sex_mce] + [
+    fmtname
+    for assignment_tables in cc_assignment_tables.values()
+    for assign_type, fmtname in assignment_tables]
+
+#: rows of the CSV read at a time
+CSV_CHUNKSIZE = 10000
+
+
+#: layout version of the compiled formats artifact
+ARTIFACT_VERSION = 2
+
 
 class HccFormats:
 
     def __init__(self, fname=DEFAULT_FNAME):
-        """Read CSV version of formats catalog file"""
+        """Load the lookups compiled from the CSV version of the formats
+        catalog file.  The CSV is only parsed if its compiled artifact is
+        missing or out of date (see common/artifacts.py)."""
         self.fname = fname
-        self.df = pandas.read_csv(fname, dtype={'LABEL': object})
+        arrays = artifacts.load_or_build(
+            fname, 'formats', ARTIFACT_VERSION, self.build_arrays)
+        self.load_arrays(arrays)
+
+    def read_csv(self):
+        """Read CSV version of formats catalog file, keeping only the
+        columns and format tables the model uses.  `read_stats` records the
+        rows and in-memory bytes of CSV_COLUMNS read and kept."""
+        chunks = pandas.read_csv(
+            self.fname, usecols=CSV_COLUMNS, dtype={'START': object, 'LABEL': object},
+            chunksize=CSV_CHUNKSIZE)
+        self.read_stats = {'rows_read': 0, 'bytes_read': 0}
+        kept = []
+        for chunk in chunks:
+            self.read_stats['rows_read'] += len(chunk)
+            self.read_stats['bytes_read'] += int(chunk.memory_usage(deep=True).sum())
+            kept.append(chunk[chunk['FMTNAME'].isin(FMTNAMES)])
+        self.df = pandas.concat(kept, ignore_index=True)
+        self.read_stats['rows_kept'] = len(self.df)
+        self.read_stats['bytes_kept'] = int(self.df.memory_usage(deep=True).sum())
         self.parse_tables()
 
     def parse_tables(self):
         """Split the single DataFrame into tables (e.g. AGEL, AGEU, ...)"""
-        self.tables = {}
-        for fmtname in self.df['FMTNAME'].unique():
-            tbl = self.df[self.df['FMTNAME']==fmtname]
-            tbl = tbl.set_index('START')
-            self.tables[fmtname] = tbl.copy()
+        self.tables = {
+            fmtname: tbl.set_index('START')
+            for fmtname, tbl in self.df.groupby('FMTNAME', sort=False)}
+
+    def _label_dict(self, fmtname):
+        """Return a {START: LABEL} dict for one table (without the SAS
+        "**OTHER**" catch-all row)"""
+        tbl = self.tables[fmtname]
+        return {
+            start: label for start, label in zip(tbl.index, tbl['LABEL'])
+            if start != '**OTHER**'}
+
+    def compile_lookups(self):
+        """Precompile the tables used for every diagnosis into plain dicts
+        keyed by diagnosis type and then diagnosis code.  This way the
+        per-diagnosis lookups below never touch pandas."""
+        agel = self._label_dict('AGEL')
+        ageu = self._label_dict('AGEU')
+
+        # diagnosis code -> (age_lo, age_hi)
+        age_limits = {}
+        for diag_code, label in self._label_dict(age_mce).items():
+            _tage = str(int(label))
+            if _tage in agel and _tage in ageu:
+                age_limits[diag_code] = (int(agel[_tage]), int(ageu[_tage]))
+        self.age_limits = {0: age_limits}
+
+        # diagnosis code -> sex
+        self.sex_limits = {0: {
+            diag_code: int(label)
+            for diag_code, label in self._label_dict(sex_mce).items()}}
+
+        # diagnosis code -> condition category for each assignment type
+        self.cc_assignments = {}
+        for diag_type, assignment_tables in cc_assignment_tables.items():
+            self.cc_assignments[diag_type] = [
+                (assign_type, {
+                    diag_code: int(label)
+                    for diag_code, label in self._label_dict(fmtname).items()})
+                for assign_type, fmtname in assignment_tables]
+
+    def build_arrays(self):
+        """Compile the lookups from the CSV and return them as arrays"""
+        self.read_csv()
+        self.compile_lookups()
+        arrays = {}
+        for diag_type, assignments in self.cc_assignments.items():
+            artifacts.add_lookup(arrays, 'age_{}'.format(diag_type), self.age_limits[diag_type])
+            artifacts.add_lookup(arrays, 'sex_{}'.format(diag_type), self.sex_limits[diag_type])
+            for assign_type, lookup in assignments:
+                artifacts.add_lookup(
+                    arrays, 'cc_{}_{}'.format(diag_type, assign_type), lookup)
+        return arrays
+
+    def load_arrays(self, arrays):
+        """Set the lookups from arrays returned by build_arrays (as
+        read-only flat.ArrayLookup mappings over the artifact arrays)"""
+        self.age_limits = {}
+        self.sex_limits = {}
+        self.cc_assignments = {}
+        for diag_type, assignment_tables in cc_assignment_tables.items():
+            self.age_limits[diag_type] = artifacts.get_lookup(
+                arrays, 'age_{}'.format(diag_type))
+            self.sex_limits[diag_type] = artifacts.get_lookup(
+                arrays, 'sex_{}'.format(diag_type))
+            self.cc_assignments[diag_type] = [
+                (assign_type, artifacts.get_lookup(
+                    arrays, 'cc_{}_{}'.format(diag_type, assign_type)))
+                for assign_type, fmtname in assignment_tables]
 
     def validate_diag_type(self, diag_type, valid_diag_types):
         """Assert the diag_type is valid"""
@@ -42,13 +153,11 @@ class HccFormats:
     def sedit_check_age(self, diag_code, age, diag_type):
         """Check MCE age restrictions on diagnosis code"""
         self.validate_diag_type(diag_type, [0])
-        df = self.tables[age_mce]
+        limits = self.age_limits[diag_type].get(diag_code)
 
         valid = True
-        if diag_code in df.index:
-            _tage = str(int(df.loc[diag_code]['LABEL']))
-            age_lo = int(self.tables['AGEL'].loc[_tage]['LABEL'])
-            age_hi = int(self.tables['AGEU'].loc[_tage]['LABEL'])
+        if limits is not None:
+            age_lo, age_hi = limits
             if age < age_lo or age > age_hi:
                 valid = False
         return valid
@@ -56,64 +165,53 @@ class HccFormats:
     def sedit_check_sex(self, diag_code, sex, diag_type):
         """Check MCE sex restrictions on diagnosis code"""
         self.validate_diag_type(diag_type, [0])
-        df = self.tables[sex_mce]
+        _tsex = self.sex_limits[diag_type].get(diag_code)
 
         valid = True
-        if diag_code in df.index:
-            _tsex = int(df.loc[diag_code]['LABEL'])
-            if _tsex != sex:
-                valid = False
+        if _tsex is not None and _tsex != sex:
+            valid = False
         return valid
 
+    def mce_restricted(self, diag_code, diag_type):
+        """Return True if the MCE edits restrict the ages or the sex of the
+        diagnosis code"""
+        return (diag_code in self.age_limits.get(diag_type, {}) or
+                diag_code in self.sex_limits.get(diag_type, {}))
+
+    def _cc_assignment(self, diag_code, diag_type, assign_type):
+        """Condition category from one assignment table (-1 if not mapped)"""
+        for _assign_type, lookup in self.cc_assignments[diag_type]:
+            if _assign_type == assign_type:
+                return lookup.get(diag_code, -1)
+
     def cc_pri_assignment(self, diag_code, diag_type):
         """Primary diagnosis to condition category assignment"""
         self.validate_diag_type(diag_type, [0])
-        df = self.tables[icd10_map_primary]
-        cc = -1
-        if diag_code in df.index:
-            cc = int(df.loc[diag_code]['LABEL'])
-        return cc
+        return self._cc_assignment(diag_code, diag_type, 'primary')
 
     def cc_dup_assignment(self, diag_code, diag_type):
         """Duplicate diagnosis to condition category assignment"""
         self.validate_diag_type(diag_type, [0])
-        df = self.tables[icd10_map_duplicate]
-        cc = -1
-        if diag_code in df.index:
-            cc = int(df.loc[diag_code]['LABEL'])
-        return cc
+        return self._cc_assignment(diag_code, diag_type, 'duplicate')
 
     def cc_sec_assignment(self, diag_code, diag_type):
         """Secondary diagnosis to condition category assignment"""
         self.validate_diag_type(diag_type, [0])
-        df = self.tables[icd10_map_secondary]
-        cc = -1
-        if diag_code in df.index:
-            cc = int(df.loc[diag_code]['LABEL'])
-        return cc
+        return self._cc_assignment(diag_code, diag_type, 'secondary')
 
     def diag_to_ccs(self, diag_code, diag_type):
         """Diagnosis diagnosis to condition category assignment"""
         # create a list of dicts where each dict represents a condition category
-        ccs = []
-        if diag_type == 0:
-            cc = self.cc_pri_assignment(diag_code, diag_type)
-            if cc != -1:
-                ccs.append({'cc': cc, 'assign_type': 'primary'})
-            cc = self.cc_dup_assignment(diag_code, diag_type)
-            if cc != -1:
-                ccs.append({'cc': cc, 'assign_type': 'duplicate'})
-            cc = self.cc_sec_assignment(diag_code, diag_type)
-            if cc != -1:
-                ccs.append({'cc': cc, 'assign_type': 'secondary'})
-        else:
+        if diag_type not in self.cc_assignments:
             raise ValueError('diag_type must be in [0]')
 
-        # add common values to each dict
-        ccs = [
-            {'diag_code': diag_code, 'diag_type': diag_type,
-             'cc': el['cc'], 'assign_type': el['assign_type']}
-             for el in ccs]
+        ccs = []
+        for assign_type, lookup in self.cc_assignments[diag_type]:
+            cc = lookup.get(diag_code, -1)
+            if cc != -1:
+                ccs.append(
+                    {'diag_code': diag_code, 'diag_type': diag_type,
+                     'cc': cc, 'assign_type': assign_type})
         return ccs
 
 
@@ -122,24 +220,16 @@ class HccFormats:
         codes and HCCs
         """
         all_mappings = []
-
-        icd10_tables = [
-            ('primary', self.tables[icd10_map_primary]),
-            ('duplicate', self.tables[icd10_map_duplicate]),
-            ('secondary', self.tables[icd10_map_secondary]),
-        ]
-        for assign_type, table in icd10_tables:
-            for tup in table.itertuples():
-                # little bit of cleanup (one row has "**OTHER**" for diag code)
-                if tup.Index == '**OTHER**':
-                    continue
-                dh_mapping = {
-                    'assignment_type': assign_type,
-                    'diag_code': tup.Index,
-                    'diag_type': 0,
-                    'hcc_code': tup.LABEL,
-                }
-                all_mappings.append(dh_mapping)
+        for diag_type, assignments in self.cc_assignments.items():
+            for assign_type, lookup in assignments:
+                for diag_code, cc in lookup.items():
+                    dh_mapping = {
+                        'assignment_type': assign_type,
+                        'diag_code': diag_code,
+                        'diag_type': diag_type,
+                        'hcc_code': str(cc),
+                    }
+                    all_mappings.append(dh_mapping)
 
         return all_mappings
 
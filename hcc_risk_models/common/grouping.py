@@ -0,0 +1,72 @@
+"""
+Group diagnoses by patient once per batch.
+
+The diagnoses DataFrame has one row per patient diagnosis.  Instead of
+looking up each patient in a non-unique pt_id index, the rows are sorted
+by patient once into a compressed (CSR style) layout: flat diagnosis code
+and type arrays plus an offset array marking where each patient's
+diagnoses start and stop,
+
+    groups = DiagnosisGroups(diagnoses)
+    if pt_id in groups:
+        diag_codes, diag_types = groups.get(pt_id)   # O(1) array slices
+
+Patients are split into partitions (spill files in common/streaming.py,
+worker shards in common/parallel.py) by a salted hash of pt_id with
+`partition_keys`, so every patient's demographics and diagnoses land in the
+same partition.
+"""
+import numpy
+import pandas
+
+
+class DiagnosisGroups:
+    """Diagnoses grouped by patient in a compressed layout
+
+    Within each patient, diagnoses keep the order they had in `diagnoses`.
+
+    Args:
+      diagnoses (DataFrame): columns pt_id, diag_code and diag_type
+    """
+
+    def __init__(self, diagnoses):
+        codes, pt_ids = pandas.factorize(diagnoses['pt_id'])
+        keep = numpy.flatnonzero(codes >= 0)  # skip rows with a missing pt_id
+        order = keep[numpy.argsort(codes[keep], kind='stable')]
+
+        self.diag_codes = diagnoses['diag_code'].to_numpy()[order]
+        self.diag_types = diagnoses['diag_type'].to_numpy()[order]
+        counts = numpy.bincount(codes[keep], minlength=len(pt_ids))
+        self.offsets = numpy.zeros(len(pt_ids) + 1, dtype=numpy.int64)
+        numpy.cumsum(counts, out=self.offsets[1:])
+        self.index = {pt_id: ipt for ipt, pt_id in enumerate(pt_ids)}
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, pt_id):
+        return pt_id in self.index
+
+    def get(self, pt_id):
+        """Return (diag_codes, diag_types) arrays for one patient
+
+        Both arrays are empty if the patient has no diagnoses.
+        """
+        ipt = self.index.get(pt_id)
+        if ipt is None:
+            return self.diag_codes[:0], self.diag_types[:0]
+        start, stop = self.offsets[ipt], self.offsets[ipt + 1]
+        return self.diag_codes[start:stop], self.diag_types[start:stop]
+
+
+def partition_keys(pt_ids, fanout, depth):
+    """Return the partition (0 to fanout - 1) of each pt_id
+
+    The hash is salted with `depth` so that splitting a partition again
+    spreads its patients over new partitions.  pt_ids are hashed as
+    strings so that e.g. 1001 and '1001' land in the same partition.
+    """
+    hashes = pandas.util.hash_pandas_object(
+        pandas.Series(pt_ids).astype(str), index=False,
+        hash_key='hcc-stream-{:05d}'.format(depth))
+    return (hashes.to_numpy() % numpy.uint64(fanout)).astype(numpy.int64)
@@ -0,0 +1,96 @@
+"""
+Diagnosis predictors of a whole population computed with array operations.
+
+Each model declares its diagnostic categories and interaction terms as
+data in its regression_variables module,
+
+    DIAG_CAT_HCCS = {'CHF': ['HCC85'], 'DIABETES': ['HCC17', 'HCC18', 'HCC19'], ...}
+    INTERACTIONS = {'DIABETES_CHF': ('DIABETES', 'CHF'), ...}
+
+where the factors of an interaction are HCC variables, diagnostic
+categories or DISABL.  `DiagnosisPredictors` resolves the names to column
+indices once and then turns a (person x HCC) 0/1 matrix into the (person x
+predictor) matrix of HCC and interaction variables in one pass,
+
+    table = DiagnosisPredictors(HCC_NAMES, rv.DIAG_CAT_HCCS, rv.INTERACTIONS)
+    preds = table.evaluate(hccs, disabl)   # shape (n_people, len(table.names))
+
+"""
+import numpy
+
+
+#: factor name of the disabled indicator
+DISABL = 'DISABL'
+
+
+class DiagnosisPredictors:
+    """Compute HCC and interaction predictor variables from HCC flags
+
+    Args:
+      hcc_names (list): HCC variable names ('HCC<number>'), the columns of
+                        the HCC matrix
+      diag_cat_hccs (dict): diagnostic category -> HCC variable names (the
+                            category is flagged if any of them is)
+      interactions (dict): interaction variable -> (factor, factor), each
+                           factor an HCC variable, a diagnostic category
+                           or DISABL
+    """
+
+    def __init__(self, hcc_names, diag_cat_hccs, interactions):
+        self.hcc_names = list(hcc_names)
+        self.hcc_columns = {
+            int(name[3:]): icol for icol, name in enumerate(self.hcc_names)}
+        self.interaction_names = list(interactions)
+
+        #: predictor variable names, the columns of evaluate()
+        self.names = self.hcc_names + self.interaction_names
+
+        # factor columns: HCCs, then diagnostic categories, then DISABL
+        n_hcc = len(self.hcc_names)
+        factor_index = {name: icol for icol, name in enumerate(self.hcc_names)}
+        self.category_members = []
+        for icat, (category, hccs) in enumerate(diag_cat_hccs.items()):
+            factor_index[category] = n_hcc + icat
+            self.category_members.append(
+                numpy.array([factor_index[hcc] for hcc in hccs], dtype=numpy.int64))
+        factor_index[DISABL] = n_hcc + len(self.category_members)
+        self.n_factors = factor_index[DISABL] + 1
+
+        self.interaction_factors = numpy.array(
+            [[factor_index[factor] for factor in interactions[name]]
+             for name in self.interaction_names],
+            dtype=numpy.int64).reshape(-1, 2)
+
+    def hcc_matrix(self, n_people, rows, hccs):
+        """Return the (person x HCC) 0/1 matrix flagging HCC number
+        `hccs[i]` for person `rows[i]` (HCCs without a column are ignored)"""
+        matrix = numpy.zeros((n_people, len(self.hcc_names)), dtype=numpy.int8)
+        cols = [self.hcc_columns.get(hcc, -1) for hcc in hccs]
+        keep = [icol >= 0 for icol in cols]
+        matrix[numpy.array(rows, dtype=numpy.int64)[keep],
+               numpy.array(cols, dtype=numpy.int64)[keep]] = 1
+        return matrix
+
+    def evaluate(self, hccs, disabl):
+        """Return the (person x predictor) 0/1 matrix with columns `names`
+
+        Args:
+          hccs (numpy.ndarray): (person x HCC) 0/1 matrix
+          disabl (sequence): 0/1 disabled indicator of each person
+        """
+        n_people, n_hcc = hccs.shape
+        factors = numpy.zeros((n_people, self.n_factors), dtype=numpy.int8)
+        factors[:, :n_hcc] = hccs
+        for icat, members in enumerate(self.category_members):
+            factors[:, n_hcc + icat] = hccs[:, members].max(axis=1, initial=0)
+        factors[:, -1] = disabl
+
+        preds = numpy.empty((n_people, len(self.names)), dtype=numpy.int8)
+        preds[:, :n_hcc] = hccs
+        preds[:, n_hcc:] = (factors[:, self.interaction_factors[:, 0]] *
+                            factors[:, self.interaction_factors[:, 1]])
+        return preds
+
+    def to_dict(self, preds_row):
+        """Return {predictor name: 0 or 1} for one row of evaluate()"""
+        return dict(zip(self.names, preds_row.tolist()))
@@ -0,0 +1,72 @@
+"""
+Class attributes that are loaded on first use.
+
+Model classes hold large read-only tables (formats, coefficients, ICD
+descriptions) as class attributes.  Declaring them as `LazyTable` instead
+of building them in the class body means importing a model module is cheap
+and each table is read from disk the first time it is accessed,
+
+    class Model:
+        FORMATS = LazyTable(lambda cls: f2217o1p.HccFormats(FORMATS_FILE))
+        COEFFICIENTS = LazyTable(lambda cls: coeff_loader.Coefficients(COEFFICIENTS_FILE))
+
+Loading is guarded by a lock so concurrent first accesses from several
+threads load a table exactly once.
+"""
+import threading
+import time
+
+
+class LazyTable:
+    """Descriptor that builds a class attribute on first access
+
+    Args:
+      loader (callable): called with the owner class, returns the table
+    """
+
+    def __init__(self, loader):
+        self.loader = loader
+        self.lock = threading.Lock()
+        self.loaded = False
+        self.value = None
+        self.load_time = None
+
+    def __get__(self, instance, owner):
+        if not self.loaded:
+            with self.lock:
+                if not self.loaded:
+                    time_start = time.time()
+                    self.value = self.loader(owner)
+                    self.load_time = time.time() - time_start
+                    self.loaded = True
+        return self.value
+
+
+def lazy_tables(cls):
+    """Return {attribute name: LazyTable} for every lazy table of `cls`"""
+    tables = {}
+    for klass in reversed(cls.__mro__):
+        for name, attr in vars(klass).items():
+            if isinstance(attr, LazyTable):
+                tables[name] = attr
+    return tables
+
+
+def load_tables(cls):
+    """Load every lazy table of `cls` and return their load times
+
+    Returns:
+      load_times (dict): attribute name -> seconds spent loading the table
+                         (0.0 for tables that were already loaded)
+    """
+    load_times = {}
+    for name, table in lazy_tables(cls).items():
+        already_loaded = table.loaded
+        getattr(cls, name)
+        load_times[name] = 0.0 if already_loaded else table.load_time
+    return load_times
+
+
+def tables_loaded(cls):
+    """Return True if every lazy table of `cls` has been loaded"""
+    return all(table.loaded for table in lazy_tables(cls).values())
@@ -0,0 +1,84 @@
+"""
+Bounded least-recently-used cache with hit and miss counters.
+
+Unlike functools.lru_cache the caller builds the key, so it can leave out
+arguments that do not affect the result,
+
+    cache = LRUCache(maxsize=2**16)
+    value = cache.get(key)
+    if value is None:
+        value = compute()
+        cache.put(key, value)
+    cache.info()   # {'hits': ..., 'misses': ..., 'size': ..., 'maxsize': ...}
+
+"""
+import collections
+import threading
+
+
+class LRUCache:
+    """Thread-safe mapping that holds at most `maxsize` entries, dropping
+    the least recently used one first
+
+    Args:
+      maxsize (int): maximum number of entries
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.lock = threading.Lock()
+        self.entries = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __getstate__(self):
+        # a copy (e.g. in a worker process) starts with an empty cache
+        return {'maxsize': self.maxsize}
+
+    def __setstate__(self, state):
+        self.__init__(state['maxsize'])
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key, default=None):
+        """Return the value cached for `key` (`default` if there is none)
+        and count a hit or a miss"""
+        with self.lock:
+            try:
+                value = self.entries[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """Cache `value` for `key`, evicting the least recently used entry
+        if the cache is full"""
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def count(self, hits, misses):
+        """Add hits and misses counted elsewhere (e.g. by the copy of the
+        cache in a worker process)"""
+        with self.lock:
+            self.hits += hits
+            self.misses += misses
+
+    def clear(self):
+        """Drop every entry and reset the counters"""
+        with self.lock:
+            self.entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def info(self):
+        """Return {'hits', 'misses', 'size', 'maxsize'}"""
+        with self.lock:
+            return {'hits': self.hits, 'misses': self.misses,
+                    'size': len(self.entries), 'maxsize': self.maxsize}
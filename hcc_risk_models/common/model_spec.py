@@ -0,0 +1,197 @@
+"""
+Declarative model specifications and their compilation into execution plans.
+
+The CMS-HCC models in this package differ only in data: their segments and
+predictor lists, the SAS formats, coefficient and ICD description files
+they read, the MCE edits applied to each diagnosis type, the hierarchy and
+the interaction terms.  Each model declares that data once as a
+`ModelSpec`,
+
+    SPEC = model_spec.ModelSpec(
+        name='V2216_79_O2',
+        description='CMS-HCC 2017 Initial Model, 79 HCC Variables',
+        segments=[
+            ('CNA', 'Community NonDual Aged', rv.COMM_REGA),
+            ...
+        ],
+        regression_variables=rv,
+        formats=(f221690p.HccFormats, FORMATS_FILE),
+        coefficients=(coeff_loader.Coefficients, COEFFICIENTS_FILE),
+        icd_descriptions={
+            0: (icd10cm_descriptions_2016.Icd10CmDefinitions, ORDER_FNAME)},
+        edits={0: v22i0ed1.icd10_edits},
+        edit_codes={0: v22i0ed1.AGE_SEX_CODES},
+        hierarchy=v22h79h1.impose_hierarchy_2,
+        hcc_descriptions=v22h79l1.HCC_DESCRIPTIONS,
+        medicaid='ltimcaid',
+    )
+
+and `compile_spec` turns it into the model's execution plan: the constants
+and lazily loaded tables (shared formats and coefficient tables, the
+segment coefficient matrix, the demographic cell table, the diagnosis
+predictor table, per diagnosis type edit and description dispatch) that
+the shared implementation in common/risk_model.py runs on.  A model class is then just
+
+    class V2216_79_O2(risk_model.RiskModel):
+        SPEC = SPEC
+
+"""
+from hcc_risk_models.common import demographics
+from hcc_risk_models.common import interactions
+from hcc_risk_models.common import lazy
+from hcc_risk_models.common import scoring
+from hcc_risk_models.common import table_cache
+
+
+#: diagnosis type -> model attribute holding its ICD description table
+ICD_DEFS_ATTRIBUTES = {0: 'ICD10_DEFS', 9: 'ICD9_DEFS'}
+
+#: names every regression_variables module must define
+REGRESSION_VARIABLES = [
+    'SCOREVARS', 'HCCV22_list79', 'NE_AGESEXV', 'ONE_AGESEXV',
+    'DIAG_CAT_HCCS', 'INTERACTIONS',
+]
+
+#: Medicaid input columns (ltimcaid for the 2017 models, mcaid before)
+MEDICAID_COLUMNS = ['ltimcaid', 'mcaid']
+
+
+class ModelSpec:
+    """Declarative description of one CMS-HCC risk model
+
+    Args:
+      name (str): model name (e.g. 'V2216_79_O2')
+      description (str): human readable model description
+      segments (list): (segment name, description, predictor list) in score
+                       order, one per entry of regression_variables.SCOREVARS
+      regression_variables (module): the model's SAS regression variables
+                                     (see REGRESSION_VARIABLES)
+      formats (tuple): (loader, source path, ...) of the formats table
+      coefficients (tuple): (loader, source path, ...) of the coefficients
+      icd_descriptions (dict): diagnosis type -> (loader, source path, ...)
+                               of the ICD description table
+      edits (dict): diagnosis type -> MCE edit function with the signature
+                    of v22i0ed1.icd10_edits
+      edit_codes (dict): diagnosis type -> codes whose edits depend on age
+                         or sex apart from the MCE lists (e.g.
+                         v22i0ed1.AGE_SEX_CODES).  Used to key the cache of
+                         diagnosis mappings; if None every mapping is
+                         cached by age and sex.
+      hierarchy (callable): imposes the HCC hierarchy on a list of
+                            diagnosis to CC mappings
+      hcc_descriptions (dict): HCC variable name -> description
+      medicaid (str): name of the Medicaid input column (MEDICAID_COLUMNS)
+      medicaid_interactions (bool): add the community MCAID x sex x
+                                    aged/disabled predictors
+    """
+
+    def __init__(self, name, description, segments, regression_variables,
+                 formats, coefficients, icd_descriptions, edits, hierarchy,
+                 hcc_descriptions, medicaid, medicaid_interactions=False,
+                 edit_codes=None):
+        self.name = name
+        self.description = description
+        self.segments = list(segments)
+        self.regression_variables = regression_variables
+        self.formats = tuple(formats)
+        self.coefficients = tuple(coefficients)
+        self.icd_descriptions = {
+            diag_type: tuple(table) for diag_type, table in icd_descriptions.items()}
+        self.edits = dict(edits)
+        self.edit_codes = None
+        if edit_codes is not None:
+            self.edit_codes = {
+                diag_type: frozenset(codes) for diag_type, codes in edit_codes.items()}
+        self.hierarchy = hierarchy
+        self.hcc_descriptions = hcc_descriptions
+        self.medicaid = medicaid
+        self.medicaid_interactions = medicaid_interactions
+        self.validate()
+
+    @property
+    def diag_types(self):
+        """Diagnosis types (9 for ICD-9, 0 for ICD-10) the model accepts"""
+        return sorted(self.edits)
+
+    def validate(self):
+        """Raise ValueError if the specification is inconsistent"""
+        rv = self.regression_variables
+        missing = [name for name in REGRESSION_VARIABLES if not hasattr(rv, name)]
+        if missing:
+            raise ValueError('{}: regression variables missing {}'.format(
+                self.name, missing))
+
+        if len(self.segments) != len(rv.SCOREVARS):
+            raise ValueError('{}: {} segments but {} SCOREVARS'.format(
+                self.name, len(self.segments), len(rv.SCOREVARS)))
+        seg_names = [segment[0] for segment in self.segments]
+        if len(set(seg_names)) != len(seg_names):
+            raise ValueError('{}: duplicate segment names'.format(self.name))
+
+        for diag_type in self.edits:
+            if diag_type not in ICD_DEFS_ATTRIBUTES:
+                raise ValueError('{}: unknown diag_type {}'.format(self.name, diag_type))
+            if diag_type not in self.icd_descriptions:
+                raise ValueError('{}: no ICD descriptions for diag_type {}'.format(
+                    self.name, diag_type))
+
+        if self.edit_codes is not None and set(self.edit_codes) != set(self.edits):
+            raise ValueError('{}: edit_codes and edits have different diag_types'.format(
+                self.name))
+
+        if self.medicaid not in MEDICAID_COLUMNS:
+            raise ValueError('{}: medicaid must be one of {}'.format(
+                self.name, MEDICAID_COLUMNS))
+
+
+def _table(source):
+    """Return a LazyTable loading `source` = (loader, path, ...) through the
+    shared table cache"""
+    return lazy.LazyTable(lambda cls: table_cache.load(*source))
+
+
+def compile_spec(spec):
+    """Compile a ModelSpec into the execution plan of a model class
+
+    The plan is a dict of class attributes.  Constants are derived from the
+    spec up front; every table is a LazyTable, so compiling is cheap and
+    tables are still loaded (once, and shared between models through
+    table_cache) on first use.
+
+    Returns:
+      plan (dict): class attribute name -> value
+    """
+    rv = spec.regression_variables
+    plan = {
+        'SPEC': spec,
+        'NAME': spec.name,
+        'DESCRIPTION': spec.description,
+        'SEGMENT_NAMES': [name for name, _, _ in spec.segments],
+        'SEGMENT_DESCRIPTIONS': {name: desc for name, desc, _ in spec.segments},
+        'SEGMENT_PREDICTORS': {name: preds for name, _, preds in spec.segments},
+        'SCORE_NAMES': list(rv.SCOREVARS),
+        'HCC_NAMES': list(rv.HCCV22_list79),
+        'HCC_DESCRIPTIONS': spec.hcc_descriptions,
+        'DIAG_TYPES': spec.diag_types,
+        'EDITS': dict(spec.edits),
+        'EDIT_CODES': spec.edit_codes,
+        'IMPOSE_HIERARCHY': staticmethod(spec.hierarchy),
+        'MEDICAID': spec.medicaid,
+        'REQUIRED_DEMOGRAPHICS_COLUMNS': [
+            'pt_id', 'sex', 'dob', spec.medicaid, 'nemcaid', 'orec'],
+
+        'FORMATS': _table(spec.formats),
+        'COEFFICIENTS': _table(spec.coefficients),
+        'SEGMENT_COEFFICIENTS': lazy.LazyTable(
+            lambda cls: scoring.SegmentCoefficients(
+                cls.COEFFICIENTS, cls.SEGMENT_NAMES, cls.SEGMENT_PREDICTORS)),
+        'DEMOGRAPHIC_TABLE': lazy.LazyTable(
+            lambda cls: demographics.DemographicTable(
+                cls.create_demographic_predictors, cls.SEGMENT_COEFFICIENTS)),
+        'DIAGNOSIS_PREDICTORS': lazy.LazyTable(
+            lambda cls: interactions.DiagnosisPredictors(
+                list(cls.HCC_DESCRIPTIONS), rv.DIAG_CAT_HCCS, rv.INTERACTIONS)),
+    }
+    for diag_type, source in spec.icd_descriptions.items():
+        plan[ICD_DEFS_ATTRIBUTES[diag_type]] = _table(source)
+    return plan
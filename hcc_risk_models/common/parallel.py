@@ -0,0 +1,205 @@
+"""
+Evaluate a risk model on several CPU cores.
+
+Patients are split into `workers` shards by a hash of pt_id (every
+patient's diagnoses go to the same shard as their demographics), each
+shard is scored by `model.evaluate_risk` in its own process, and the shard
+results are merged back into the order of the demographics rows, so the
+result is the same as with a single process.
+
+The worker processes are held by a `WorkerPool`.  Callers that score many
+batches (e.g. common/streaming.py) start one pool and pass it to every
+call instead of starting a pool per batch,
+
+    with WorkerPool(model, 8) as pool:
+        for demographics, diagnoses in batches:
+            model.evaluate_risk(demographics, diagnoses, pool=pool)
+
+Model tables are loaded in the parent before the pool is started.  Where
+the 'fork' start method is available the worker processes share those
+tables copy-on-write instead of loading them again.  A parent that already
+runs other threads (e.g. the model warm-up thread of api/flask_app.py) is
+not forked, since its children would inherit locks held by those threads;
+its pool uses 'forkserver' and each worker loads the tables it needs.
+"""
+import multiprocessing
+import threading
+
+import numpy
+import pandas
+
+from hcc_risk_models.common import grouping
+from hcc_risk_models.common import results
+
+
+def _get_context():
+    """Return a multiprocessing context, preferring 'fork' while this
+    process runs no other thread"""
+    methods = multiprocessing.get_all_start_methods()
+    if 'fork' in methods and threading.active_count() == 1:
+        return multiprocessing.get_context('fork')
+    if 'forkserver' in methods:
+        return multiprocessing.get_context('forkserver')
+    return multiprocessing.get_context()
+
+
+#: the model of a worker process (set by _init_worker)
+_worker_model = None
+
+
+def _init_worker(model):
+    global _worker_model
+    _worker_model = model
+
+
+class WorkerPool:
+    """Pool of worker processes, each holding its own copy of `model`
+
+    Workers keep their copy (and so its diagnosis mapping cache) for the
+    life of the pool.  Use the pool as a context manager, or call close().
+
+    Args:
+      model: a risk model instance
+      workers (int): number of processes
+    """
+
+    def __init__(self, model, workers):
+        # load tables before forking so workers share them
+        model.load()
+        self.model = model
+        self.workers = workers
+        self.pool = _get_context().Pool(
+            workers, initializer=_init_worker, initargs=(model,))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.terminate()
+
+    def close(self):
+        """Wait for the workers to finish and stop them"""
+        self.pool.close()
+        self.pool.join()
+
+    def terminate(self):
+        """Stop the workers at once"""
+        self.pool.terminate()
+        self.pool.join()
+
+    def map(self, shards):
+        """Score (demographics, diagnoses, kwargs) shards in the workers
+
+        Returns one (result, counters) pair per shard (see _evaluate_shard).
+        """
+        return self.pool.map(_evaluate_shard, shards, chunksize=1)
+
+
+def _counters(model):
+    """Return the (people, profiles, cache hits, cache misses) counted so
+    far by `model` (zeros for counters the model does not keep)"""
+    n_people, n_profiles, n_hits, n_misses = 0, 0, 0, 0
+    if getattr(model, 'profile_counts', None) is not None:
+        n_people, n_profiles = model.profile_counts.totals()
+    if getattr(model, 'icd_cache', None) is not None:
+        info = model.icd_cache.info()
+        n_hits, n_misses = info['hits'], info['misses']
+    return n_people, n_profiles, n_hits, n_misses
+
+
+def _add_counters(model, counters):
+    """Add counters from a worker to the parent's `model`"""
+    n_people, n_profiles, n_hits, n_misses = counters
+    if getattr(model, 'profile_counts', None) is not None:
+        model.profile_counts.add(n_people, n_profiles)
+    if getattr(model, 'icd_cache', None) is not None:
+        model.icd_cache.count(n_hits, n_misses)
+
+
+def _evaluate_shard(args):
+    """Score one shard in a worker process
+
+    Returns the shard result and the counters (see _counters) of the work
+    done for it, so the parent can add them to its own model's counters.
+    """
+    demographics, diagnoses, kwargs = args
+    model = _worker_model
+    before = _counters(model)
+    result = model.evaluate_risk(demographics, diagnoses, **kwargs)
+    after = _counters(model)
+    return result, tuple(n_after - n_before for n_before, n_after in zip(before, after))
+
+
+def evaluate_risk_parallel(model, demographics, diagnoses, workers, do_sedits=True,
+                           date_asof=None, as_json=False, output='dict',
+                           verbosity='full', pool=None):
+    """Evaluate `model` with a pool of `workers` processes
+
+    Takes the same arguments as model.evaluate_risk (which calls this
+    function when it is given workers > 1 or a pool) and returns the same
+    result.  If `pool` (a WorkerPool of `model`) is given the shards are
+    scored in it and `workers` is ignored; otherwise a pool is started for
+    this call only.
+    """
+    if pool is not None:
+        workers = pool.workers
+
+    demo_keys = grouping.partition_keys(demographics['pt_id'], workers, 0)
+    diag_keys = grouping.partition_keys(diagnoses['pt_id'], workers, 0)
+
+    kwargs = {'do_sedits': do_sedits, 'date_asof': date_asof,
+              'output': output, 'verbosity': verbosity}
+    shards = []
+    positions = []
+    for ishard in range(workers):
+        in_shard = demo_keys == ishard
+        if not in_shard.any():
+            continue
+        positions.append(numpy.flatnonzero(in_shard))
+        shards.append((demographics[in_shard], diagnoses[diag_keys == ishard], kwargs))
+
+    if len(shards) < 2:
+        return model.evaluate_risk(demographics, diagnoses, as_json=as_json, **kwargs)
+
+    # merged shard rows -> demographics rows (the inverse of the shard
+    # permutation)
+    order = numpy.argsort(numpy.concatenate(positions), kind='stable')
+
+    if pool is not None:
+        shard_results = _map(model, pool, shards)
+    else:
+        with WorkerPool(model, len(shards)) as shard_pool:
+            shard_results = _map(model, shard_pool, shards)
+
+    # profiles are counted per shard, so one shared by several shards is
+    # counted once in each
+    model_info = dict(shard_results[0]['model_info'])
+    for key in ('n_patients', 'n_profiles'):
+        if key in model_info:
+            model_info[key] = sum(r['model_info'][key] for r in shard_results)
+    if output == 'frame':
+        return {
+            'model_info': model_info,
+            'scores': pandas.concat([r['scores'] for r in shard_results]).iloc[order],
+            'hccs': pandas.concat([r['hccs'] for r in shard_results]).iloc[order],
+        }
+
+    patients = [patient for r in shard_results for patient in r['patients']]
+    result = {
+        'model_info': model_info,
+        'patients': [patients[irow] for irow in order],
+    }
+    if as_json:
+        return results.encode_json(result)
+    return result
+
+
+def _map(model, pool, shards):
+    """Score `shards` in `pool` and add the workers' counters to `model`"""
+    shard_outputs = pool.map(shards)
+    for _, counters in shard_outputs:
+        _add_counters(model, counters)
+    return [shard_result for shard_result, _ in shard_outputs]
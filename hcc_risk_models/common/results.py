@@ -0,0 +1,88 @@
+"""
+Helpers to build model results and encode them.
+"""
+import json
+
+import numpy
+import pandas
+
+
+#: how much of each patient object evaluate_risk builds
+VERBOSITY_LEVELS = ['scores', 'hccs', 'full']
+
+def native(value):
+    """Return `value` as a builtin Python type (e.g. numpy.int64 -> int)"""
+    if isinstance(value, numpy.generic):
+        return value.item()
+    return value
+
+
+class ResultEncoder(json.JSONEncoder):
+    """A JSON encoder to handle numpy types"""
+    def default(self, obj):
+        if isinstance(obj, numpy.generic):
+            return obj.item()
+        # Let the base class default method raise the TypeError
+        return json.JSONEncoder.default(self, obj)
+
+
+def encode_json(result):
+    """Encode a result to UTF-8 JSON bytes"""
+    return json.dumps(result, cls=ResultEncoder).encode('utf-8')
+
+
+class FrameBuilder:
+    """Collect per-person results column-wise and build DataFrames from them
+
+    This is the `output='frame'` counterpart of the nested per-patient
+    dicts.  Only pt_ids and the coordinates of flagged HCCs are kept per
+    person; the score and HCC tables are built in one go at the end.
+
+    Args:
+      hcc_names (list): HCC variable names, one column each in the HCC table
+    """
+
+    def __init__(self, hcc_names):
+        self.hcc_names = list(hcc_names)
+        self.hcc_index = {name: i for i, name in enumerate(self.hcc_names)}
+        self.pt_ids = []
+        self.hcc_rows = []
+        self.hcc_cols = []
+
+    def add_person(self, pt_id, diagnosis_preds=None):
+        """Record one person and the HCCs flagged in `diagnosis_preds`"""
+        irow = len(self.pt_ids)
+        self.pt_ids.append(pt_id)
+        if diagnosis_preds is None:
+            return
+        for var, value in diagnosis_preds.items():
+            if value == 1 and var in self.hcc_index:
+                self.hcc_rows.append(irow)
+                self.hcc_cols.append(self.hcc_index[var])
+
+    def add_hcc_matrix(self, hccs, hcc_names):
+        """Record the HCCs flagged in a (person x HCC) 0/1 matrix whose rows
+        are the people already added and whose columns are `hcc_names`"""
+        columns = numpy.array(
+            [self.hcc_index.get(name, -1) for name in hcc_names], dtype=numpy.int64)
+        used = numpy.flatnonzero(columns >= 0)
+        rows, icols = numpy.nonzero(hccs[:, used])
+        self.hcc_rows.extend(rows.tolist())
+        self.hcc_cols.extend(columns[used[icols]].tolist())
+
+    def scores_frame(self, scores, score_names):
+        """Return a DataFrame with one row per pt_id and one column per segment
+
+        Args:
+          scores (numpy.ndarray): shape (n_people, n_segments)
+          score_names (list): column names (e.g. SAS SCOREVARS)
+        """
+        index = pandas.Index(self.pt_ids, name='pt_id')
+        return pandas.DataFrame(scores, index=index, columns=list(score_names))
+
+    def hccs_frame(self):
+        """Return a 0/1 DataFrame with one row per pt_id and one column per HCC"""
+        flags = numpy.zeros((len(self.pt_ids), len(self.hcc_names)), dtype=numpy.int8)
+        flags[self.hcc_rows, self.hcc_cols] = 1
+        index = pandas.Index(self.pt_ids, name='pt_id')
+        return pandas.DataFrame(flags, index=index, columns=self.hcc_names)
@@ -0,0 +1,574 @@
+"""
+Implementation shared by every CMS-HCC model.
+
+A model module declares a `model_spec.ModelSpec` and subclasses
+`RiskModel` with it,
+
+    class V2216_79_O2(risk_model.RiskModel):
+        SPEC = SPEC
+
+When the subclass is created its spec is compiled (model_spec.compile_spec)
+and the resulting execution plan installed as class attributes (NAME,
+SEGMENT_NAMES, FORMATS, COEFFICIENTS, ...), so every model runs the same
+batch scoring code below on its own tables.
+"""
+
+
+import datetime
+
+import numpy
+import pandas
+
+from hcc_risk_models.common import agesexv2
+from hcc_risk_models.common import dates
+from hcc_risk_models.common import grouping
+from hcc_risk_models.common import lazy
+from hcc_risk_models.common import lru
+from hcc_risk_models.common import model_spec
+from hcc_risk_models.common import parallel
+from hcc_risk_models.common import results
+from hcc_risk_models.common import scoring
+
+
+
+class RiskModel:
+    """Base class of the CMS-HCC risk models
+
+    Subclasses set `SPEC` to their model_spec.ModelSpec.  Each instance
+    counts the people it has scored and the distinct predictor profiles
+    among them in `profile_counts` (a scoring.ProfileCounts), and caches
+    the condition categories of recently seen diagnoses in `icd_cache` (an
+    lru.LRUCache, see map_icd_to_ccs).
+    """
+
+    SPEC = None
+    ICD_CACHE_SIZE = 2**16
+    JSON_ENCODER = results.ResultEncoder
+    REQUIRED_DIAGNOSES_COLUMNS = ['pt_id', 'diag_code', 'diag_type']
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # each model class gets its own plan (and so its own LazyTables)
+        if 'SPEC' in vars(cls):
+            for name, value in model_spec.compile_spec(cls.SPEC).items():
+                setattr(cls, name, value)
+
+
+    def __init__(self):
+        self.profile_counts = scoring.ProfileCounts()
+        self.icd_cache = lru.LRUCache(self.ICD_CACHE_SIZE)
+
+    def load(self):
+        """Load every table used by the model (they are otherwise loaded
+        on first use) and return {table name: seconds spent loading}"""
+        return lazy.load_tables(type(self))
+
+    def input_json_to_dataframes(self, input_json):
+        """Transform API input JSON to DataFrames
+
+        We expect a list of patient objects.  each patient object has the form,
+          {
+            "pt_id": 1001,
+            "sex": 1,
+            "dob": "1930-8-21",
+            "ltimcaid": 1,
+            "nemcaid": 0,
+            "orec": 2,
+            "diagnoses": [
+              {"diag_code": "A420", "diag_type": 0},
+              {"diag_code": "A4150", "diag_type": 0},
+              ...
+            ]
+          }
+
+        with "mcaid" instead of "ltimcaid" for models whose MEDICAID column
+        is mcaid.
+        """
+        demographics_keys = self.REQUIRED_DEMOGRAPHICS_COLUMNS
+        demographics = {key: [] for key in demographics_keys}
+
+        diagnoses_keys = self.REQUIRED_DIAGNOSES_COLUMNS
+        diagnoses = {key: [] for key in diagnoses_keys}
+
+        for blob in input_json:
+            for key in self.REQUIRED_DEMOGRAPHICS_COLUMNS:
+                demographics[key].append(blob[key])
+                if key == 'pt_id':
+                    pt_id = blob[key]
+
+            for diag_obj in blob['diagnoses']:
+                diagnoses['pt_id'].append(pt_id)
+                for key in ['diag_code', 'diag_type']:
+                    diagnoses[key].append(diag_obj[key])
+
+        demographics = pandas.DataFrame(demographics)
+        diagnoses = pandas.DataFrame(diagnoses)
+
+        return demographics, diagnoses
+
+
+    def validate_demographics(self, demographics):
+        """Validate a `demographics` DataFrame"""
+        missing_cols = set(self.REQUIRED_DEMOGRAPHICS_COLUMNS) - set(demographics.columns)
+        if len(missing_cols) > 0:
+            raise ValueError(
+                'demographics DataFrame missing the following required columns {}'
+                .format(list(missing_cols)))
+
+        if demographics['pt_id'].nunique() != demographics.shape[0]:
+            raise ValueError('demographics has duplicate pt_id values')
+
+
+    def validate_diagnoses(self, diagnoses):
+        """Validate a `diagnoses` DataFrame"""
+        missing_cols = set(self.REQUIRED_DIAGNOSES_COLUMNS) - set(diagnoses.columns)
+        if len(missing_cols) > 0:
+            raise ValueError(
+                'diagnoses DataFrame missing the following required columns {}'
+                .format(list(missing_cols)))
+
+
+    def evaluate_risk(self, demographics, diagnoses, do_sedits=True, date_asof=None,
+                      as_json=False, output='dict', verbosity='full', workers=1,
+                      pool=None):
+        """Evaluate the risk model for every person in the `demographics` DataFrame
+
+        The demographics DataFrame must have the following columns (one row per person),
+
+          pt_id    - arbitrary unique identifier (e.g. HICN).
+          sex      - 1=male, 2=female
+          dob      - date of birth (year-month-day string or datetime object)
+          ltimcaid - 1 if number of months in Medicaid in payment year > 0,
+                     otherwise 0 (named mcaid if the model's MEDICAID
+                     column is mcaid)
+          nemcaid  - 1 if a new Medicare enrollee and number of months in Medicaid
+                     in payment year > 0, otherwise 0
+          orec     - original reason for entitlement with the following values:
+                       0 - old  age (OASI)
+                       1 - disability (DIB)
+                       2 – end stage renal disease (ESRD)
+                       3 - both DIB AND ESRD
+
+
+        The diagnoses DataFrame must have the following columns (one row per patient
+        diagnosis)
+
+          pt_id     - arbitrary unique identifier (e.g. HICN).
+          diag_code - ICD-9 or ICD-10 diagnosis code with no periods
+          diag_type - 9 for ICD-9 codes, 0 for ICD-10 codes (see DIAG_TYPES
+                      for the types the model accepts)
+
+        If `as_json` is True the result is returned as UTF-8 encoded JSON
+        bytes instead of a dict.
+
+        `verbosity` controls how much of each patient object is built,
+
+          scores - segment scores only
+          hccs   - scores plus the diagnosis to HCC mappings (without
+                   descriptions)
+          full   - scores, diagnosis to HCC mappings with CC and diagnosis
+                   descriptions, and the coefficients behind each score
+
+        The model_info of the result also gives the number of patients
+        scored (n_patients) and of distinct risk profiles among them
+        (n_profiles), each profile being scored once.
+
+        If `output` is 'frame' no per-patient objects are built.  Instead the
+        result has two DataFrames indexed by pt_id,
+
+          scores - one column per segment (named as in the SAS SCOREVARS)
+          hccs   - one 0/1 column per HCC (after the hierarchy is imposed)
+
+        If `workers` is greater than 1 the patients are split by pt_id into
+        shards that are scored in a pool of `workers` processes.  The result
+        is the same as with one process.  To score many batches with the
+        same processes pass a parallel.WorkerPool of this model as `pool`
+        instead.
+
+        """
+        if output not in ('dict', 'frame'):
+            raise ValueError("output must be one of ['dict', 'frame']")
+        if output == 'frame' and as_json:
+            raise ValueError("as_json is not supported with output='frame'")
+        if verbosity not in results.VERBOSITY_LEVELS:
+            raise ValueError('verbosity must be one of {}'.format(results.VERBOSITY_LEVELS))
+
+        # descriptions are only looked up for fully explained patient objects
+        describe = output == 'dict' and verbosity == 'full'
+
+        self.validate_demographics(demographics)
+        self.validate_diagnoses(diagnoses)
+
+        # set date_asof to Feb. 1 of current year if none is provided
+        #--------------------------------------------------------------------
+        if date_asof is None:
+            date_asof = datetime.date(datetime.date.today().year, 2, 1)
+
+        # score shards of the population in several processes
+        #--------------------------------------------------------------------
+        if workers > 1 or pool is not None:
+            return parallel.evaluate_risk_parallel(
+                self, demographics, diagnoses, workers, do_sedits=do_sedits,
+                date_asof=date_asof, as_json=as_json, output=output,
+                verbosity=verbosity, pool=pool)
+
+        # parse dates of birth, compute all ages and reset index to pt_id
+        #--------------------------------------------------------------------
+        dob_years, dob_months, dob_days = dates.parse_dates(demographics['dob'])
+        ages = dates.age_asof(dob_years, dob_months, dob_days, date_asof)
+        demographics = demographics.set_index('pt_id')
+
+        # look up the demographic cell of every person at once: the cell
+        # holds the person's demographic predictor columns, disabled flag
+        # and demographic segment scores
+        #--------------------------------------------------------------------
+        sexes = demographics['sex'].to_numpy().astype(numpy.int64)
+        medicaids = demographics[self.MEDICAID].to_numpy().astype(numpy.int64)
+        nemcaids = demographics['nemcaid'].to_numpy().astype(numpy.int64)
+        orecs = demographics['orec'].to_numpy().astype(numpy.int64)
+        demographic_table = self.DEMOGRAPHIC_TABLE
+        icells = demographic_table.cells(ages, sexes, orecs, medicaids, nemcaids)
+        demo_scores = demographic_table.scores[icells]
+        disabls = demographic_table.disabl[icells]
+
+        # people outside the table (e.g. older than demographics.MAX_AGE)
+        # have their demographic predictors created and scored one by one
+        outside = numpy.flatnonzero(icells < 0).tolist()
+        outside_cols = {}
+        if outside:
+            outside_indicators = scoring.PredictorIndicators(self.SEGMENT_COEFFICIENTS)
+            for ipt in outside:
+                demographic_preds, disabls[ipt] = self.create_demographic_predictors(
+                    int(ages[ipt]), int(sexes[ipt]), int(orecs[ipt]),
+                    int(medicaids[ipt]), int(nemcaids[ipt]))
+                outside_cols[ipt], = outside_indicators.add_person(demographic_preds)
+            demo_scores[outside] = self.SEGMENT_COEFFICIENTS.score(outside_indicators)
+
+        # group diagnoses by patient once
+        #--------------------------------------------------------------------
+        diagnosis_groups = grouping.DiagnosisGroups(diagnoses)
+
+        # loop over people: diagnoses to HCCs and patient objects
+        #--------------------------------------------------------------------
+        patients = []
+        hcc_rows = []
+        hcc_numbers = []
+        frames = results.FrameBuilder(self.HCC_NAMES)
+        people = zip(demographics.index, ages.tolist(), sexes.tolist(),
+                     medicaids.tolist(), nemcaids.tolist(), orecs.tolist())
+        for ipt, (pt_id, agef, sex, medicaid, nemcaid, orec) in enumerate(people):
+
+            pt_id = results.native(pt_id)
+            dob = datetime.date(dob_years[ipt], dob_months[ipt], dob_days[ipt])
+
+            # map diagnoses to HCCs
+            #--------------------------------------------------------------------
+            if pt_id in diagnosis_groups:
+                diag_codes, diag_types = diagnosis_groups.get(pt_id)
+                diags_to_hccs = self.map_diagnoses(
+                    diag_codes, diag_types, agef, sex, do_sedits, describe=describe)
+            else:
+                diags_to_hccs = []
+            for el in diags_to_hccs:
+                hcc_rows.append(ipt)
+                hcc_numbers.append(el['hcc'])
+
+            # for tabular output only keep what is needed for the HCC table
+            if output == 'frame':
+                frames.add_person(pt_id)
+                continue
+
+            # construct a patient object and append to output patients
+            #--------------------------------------------------------------------
+            patient = {'pt_id': pt_id}
+            patient['demographic_data'] = {
+                'dob': dob.isoformat(),
+                'sex': sex,
+                self.MEDICAID: medicaid,
+                'nemcaid': nemcaid,
+                'orec': orec,
+                'age': agef}
+            if verbosity != 'scores':
+                patient['diagnoses_to_hccs'] = diags_to_hccs
+
+            patients.append(patient)
+
+        # create diagnosis predictor variables (HCCs and interactions) for
+        # all patients at once; they are the only predictors left to score
+        #--------------------------------------------------------------------
+        hccs = self.DIAGNOSIS_PREDICTORS.hcc_matrix(len(disabls), hcc_rows, hcc_numbers)
+        diagnosis_preds = self.DIAGNOSIS_PREDICTORS.evaluate(hccs, disabls)
+        indicators = scoring.PredictorIndicators(self.SEGMENT_COEFFICIENTS)
+        patient_diag_cols = indicators.add_matrix(
+            diagnosis_preds, self.DIAGNOSIS_PREDICTORS.names)
+
+        # add model meta data to response
+        #--------------------------------------------------------------------
+        model_info = {
+            'model_name': self.NAME,
+            'model_description': self.DESCRIPTION,
+            'model_segments': self.SEGMENT_DESCRIPTIONS,
+            'model_coefficients': {
+                'description': self.COEFFICIENTS.description,
+                'cms_denominator': self.COEFFICIENTS.cms_denominator,
+            },
+        }
+
+        # calculate segment risk scores for all patients at once: the
+        # diagnosis coefficients are added to the demographic scores, once
+        # per distinct profile (demographic cell and diagnosis predictors).
+        # people outside the table each get a cell of their own.
+        #--------------------------------------------------------------------
+        profile_cells = icells.copy()
+        profile_cells[outside] = len(demographic_table.columns) + numpy.array(
+            outside, dtype=numpy.int64)
+        classes = scoring.ProfileClasses(indicators, profile_cells)
+        self.profile_counts.add(classes.n_people, classes.n_classes)
+        model_info['n_patients'] = classes.n_people
+        model_info['n_profiles'] = classes.n_classes
+        risk_scores = self.SEGMENT_COEFFICIENTS.score(
+            indicators, classes, initial=demo_scores)
+
+        if output == 'frame':
+            frames.add_hcc_matrix(hccs, self.DIAGNOSIS_PREDICTORS.hcc_names)
+            return {
+                'model_info': model_info,
+                'scores': frames.scores_frame(risk_scores, self.SCORE_NAMES),
+                'hccs': frames.hccs_frame(),
+            }
+
+        # add the segment risk profiles to the patient objects
+        #--------------------------------------------------------------------
+        class_coeffs = {}
+        for ipt, (patient, diag_cols, pt_scores, pt_class) in enumerate(zip(
+                patients, patient_diag_cols, risk_scores.tolist(),
+                classes.inverse.tolist())):
+
+            # collect the coefficients of the flagged predictors in each
+            # segment, once per profile
+            if verbosity == 'full':
+                if pt_class not in class_coeffs:
+                    icell = int(icells[ipt])
+                    if icell >= 0:
+                        demo_cols = demographic_table.columns[icell]
+                    else:
+                        demo_cols = outside_cols[ipt]
+                    class_coeffs[pt_class] = (
+                        self.SEGMENT_COEFFICIENTS.flagged_coefficients(demo_cols),
+                        self.SEGMENT_COEFFICIENTS.flagged_coefficients(diag_cols))
+                flagged_demo_coeffs, flagged_diag_coeffs = class_coeffs[pt_class]
+
+            # we want all the data for a given model segment to be grouped
+            risk_profiles = {}
+            for seg_name, score in zip(self.SEGMENT_NAMES, pt_scores):
+                risk_profile = {}
+                risk_profile['score'] = score
+                if verbosity == 'full':
+                    # copies, so patients sharing a profile share no objects
+                    risk_profile['demographic_coefficients'] = dict(flagged_demo_coeffs[seg_name])
+                    risk_profile['diagnosis_coefficients'] = dict(flagged_diag_coeffs[seg_name])
+                risk_profile['segment_name'] = seg_name
+                risk_profile['segment_description'] = self.SEGMENT_DESCRIPTIONS[seg_name]
+                risk_profiles[seg_name] = risk_profile
+            patient['risk_profiles'] = risk_profiles
+
+        # build final result
+        #--------------------------------------------------------------------
+        result = {
+            'model_info': model_info,
+            'patients': patients,
+        }
+
+        # every value above is already a builtin Python type, so the result
+        # can be returned as is or encoded straight to JSON bytes
+        if as_json:
+            return results.encode_json(result)
+
+        return result
+
+
+    def icd_cache_key(self, agef, sex, diag_code, diag_type, do_sedits):
+        """Return the key of a diagnosis mapping in `icd_cache`
+
+        The mapping only depends on age and sex if the code is in the edit
+        checks of its diag_type or (with sedits) has MCE age/sex limits, so
+        only those codes are keyed by age and sex.
+        """
+        do_sedits = bool(do_sedits)
+        key = (diag_code, diag_type, do_sedits)
+        if self.EDIT_CODES is None:
+            return key + (agef, sex)
+        if diag_code in self.EDIT_CODES.get(diag_type, ()):
+            return key + (agef, sex)
+        if do_sedits and self.FORMATS.mce_restricted(diag_code, diag_type):
+            return key + (agef, sex)
+        return key
+
+    def map_icd_to_ccs(self, agef, sex, diag_code, diag_type, do_sedits):
+        """Map a single ICD diagnosis code to all of its condition categories
+
+        Mappings are memoized in `icd_cache` (see icd_cache_key); every call
+        returns new dicts, so callers may extend them.
+        """
+        key = self.icd_cache_key(agef, sex, diag_code, diag_type, do_sedits)
+        diag_to_ccs = self.icd_cache.get(key)
+        if diag_to_ccs is None:
+            diag_to_ccs = self._map_icd_to_ccs(agef, sex, diag_code, diag_type, do_sedits)
+            self.icd_cache.put(key, diag_to_ccs)
+        return [dict(el) for el in diag_to_ccs]
+
+    def _map_icd_to_ccs(self, agef, sex, diag_code, diag_type, do_sedits):
+        """Map a diagnosis code to its condition categories (uncached)"""
+        diag_to_ccs = []
+
+        # initial dummy value
+        cc = 9999
+
+        # check MCE edits
+        edits = self.EDITS.get(diag_type)
+        if edits is not None:
+            cc = edits(cc, agef, sex, diag_code, do_sedits, self.FORMATS)
+
+        # if the edits return a valid condition category, then append
+        if cc != -1 and cc != 9999:
+            diag_to_ccs.append(
+                {'diag_code': diag_code, 'diag_type': diag_type,
+                 'cc': cc, 'assign_type': 'mce'})
+
+        # otherwise assign condition categories and extend
+        elif cc == 9999:
+            diag_to_ccs.extend(self.FORMATS.diag_to_ccs(diag_code, diag_type))
+
+        return diag_to_ccs
+
+
+
+    def map_diagnoses(self, diag_codes, diag_types, agef, sex, do_sedits, describe=True):
+        """Map the diagnoses of one person to HCCs and impose the hierarchy
+
+        `diag_codes` and `diag_types` are parallel sequences with one entry
+        per diagnosis.  CC and diagnosis descriptions are only added if
+        `describe` is True.
+        """
+        diags_to_hccs = []
+
+        # loop over diagnoses and assign Condition Categories (CCs)
+        #--------------------------------------------------------------------
+        for diag_code, diag_type in zip(diag_codes, diag_types):
+
+            diag_code = results.native(diag_code)
+            diag_type = results.native(diag_type)
+            diag_to_ccs = self.map_icd_to_ccs(agef, sex, diag_code, diag_type, do_sedits)
+            diags_to_hccs.extend(diag_to_ccs)
+
+        # impose the hierarchy
+        #--------------------------------------------------------------------
+        diags_to_hccs = self.IMPOSE_HIERARCHY(diags_to_hccs)
+
+        # add CC and diagnosis descriptions
+        #--------------------------------------------------------------------
+        if describe:
+            for el in diags_to_hccs:
+                el['cc_description'] = self.HCC_DESCRIPTIONS['HCC{}'.format(el['cc'])]
+                icd_defs = self.icd_defs(el['diag_type'])
+                if icd_defs is not None:
+                    el['diag_description'] = icd_defs.return_long_description(el['diag_code'])
+
+        return diags_to_hccs
+
+
+    def icd_defs(self, diag_type):
+        """Return the ICD description table for `diag_type` (None if the
+        model has none)"""
+        name = model_spec.ICD_DEFS_ATTRIBUTES.get(diag_type)
+        if name is None:
+            return None
+        return getattr(self, name, None)
+
+
+
+    def create_diagnosis_predictors(self, diag_codes, diag_types, agef, sex, disabl,
+                                    do_sedits, describe=True):
+        """Calculate predictors based on diagnosis codes for one person
+
+        Returns the diagnoses to HCCs mapping and a {predictor: 0 or 1} dict
+        of the HCC and interaction variables (evaluate_risk computes the
+        same predictors for the whole population at once).
+        """
+        diags_to_hccs = self.map_diagnoses(
+            diag_codes, diag_types, agef, sex, do_sedits, describe=describe)
+        hccs = self.DIAGNOSIS_PREDICTORS.hcc_matrix(
+            1, [0] * len(diags_to_hccs), [el['hcc'] for el in diags_to_hccs])
+        preds = self.DIAGNOSIS_PREDICTORS.evaluate(hccs, [disabl])
+        return diags_to_hccs, self.DIAGNOSIS_PREDICTORS.to_dict(preds[0])
+
+
+
+    @classmethod
+    def create_demographic_predictors(cls, agef, sex, orec, medicaid, nemcaid):
+        """Calculate the demographic predictor variables.
+
+        `medicaid` is the value of the model's MEDICAID column (ltimcaid or
+        mcaid).  Only class attributes are used, so the model's
+        DEMOGRAPHIC_TABLE is built without an instance.
+        """
+        rv = cls.SPEC.regression_variables
+        preds = {}
+        preds[cls.MEDICAID.upper()] = medicaid
+
+        disabl = agesexv2.create_disabl(agef, orec)
+        origds = agesexv2.create_origds(disabl, orec)
+        preds['ORIGDS'] = origds
+
+        cell = agesexv2.create_cell(agef, sex)
+        necell = agesexv2.create_necell(agef, sex)
+        for k, v in cell.items():
+            preds[k] = v
+        for k, v in necell.items():
+            preds[k] = v
+
+        # interactions
+        if cls.SPEC.medicaid_interactions:
+            preds['MCAID_Female_Aged']     = int(medicaid==1 and sex==2 and disabl==0)
+            preds['MCAID_Female_Disabled'] = int(medicaid==1 and sex==2 and disabl==1)
+            preds['MCAID_Male_Aged']       = int(medicaid==1 and sex==1 and disabl==0)
+            preds['MCAID_Male_Disabled']   = int(medicaid==1 and sex==1 and disabl==1)
+        preds['OriginallyDisabled_Female'] = int(origds==1 and sex==2)
+        preds['OriginallyDisabled_Male']   = int(origds==1 and sex==1)
+
+        # new enrollee interactions
+        ne_origds       = int(agef>=65 and orec==1)
+        nmcaid_norigdis = int(nemcaid==0 and ne_origds==0)
+        mcaid_norigdis  = int(nemcaid==1 and ne_origds==0)
+        nmcaid_origdis  = int(nemcaid==0 and ne_origds==1)
+        mcaid_origdis   = int(nemcaid==1 and ne_origds==1)
+
+        for key in rv.NE_AGESEXV:
+            preds['NMCAID_NORIGDIS_{}'.format(key)] = nmcaid_norigdis * preds[key]
+        for key in rv.NE_AGESEXV:
+            preds['MCAID_NORIGDIS_{}'.format(key)] = mcaid_norigdis * preds[key]
+        for key in rv.ONE_AGESEXV:
+            preds['NMCAID_ORIGDIS_{}'.format(key)] = nmcaid_origdis * preds[key]
+        for key in rv.ONE_AGESEXV:
+            preds['MCAID_ORIGDIS_{}'.format(key)] = mcaid_origdis * preds[key]
+
+        return preds, disabl
+
+
+    def return_icd_hcc_mappings(self):
+        """Return JSON friendly mapping of diagnoses codes -> HCCs for this model"""
+        all_mappings = self.FORMATS.return_diag_hcc_mappings()
+        return all_mappings
+
+
+    def return_model_description(self):
+        """Return JSON friendly model description"""
+        desc = {
+            'model_name': self.NAME,
+            'model_description': self.DESCRIPTION,
+            'model_segments': self.SEGMENT_DESCRIPTIONS,
+            'model_coefficients': self.COEFFICIENTS.to_json(),
+            'hcc_descriptions': self.HCC_DESCRIPTIONS,
+            'icd_to_hcc_mappings': self.return_icd_hcc_mappings(),
+        }
+        return desc
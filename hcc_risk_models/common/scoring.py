@@ -0,0 +1,328 @@
+"""
+Batch scoring of a population against all segments of a risk model.
+
+Instead of looping over segments and predictors for every person, the
+flagged predictors of the whole population are collected into a sparse
+(person x predictor) indicator matrix which is multiplied by a dense
+(segment x predictor) coefficient matrix built from a `Coefficients` object.
+
+    coeffs = SegmentCoefficients(COEFFICIENTS, SEGMENT_NAMES, SEGMENT_PREDICTORS)
+    indicators = PredictorIndicators(coeffs)
+    for ... in people:
+        demo_cols, diag_cols = indicators.add_person(
+            demographic_preds, diagnosis_preds)
+    scores = coeffs.score(indicators)   # shape (n_people, n_segments)
+
+Predictors computed for the whole population at once (e.g. the diagnosis
+predictors from common/interactions.py) are added as a matrix with
+`indicators.add_matrix(preds, names)` after the people have been added.
+
+Most people share their flagged predictors (demographic cell and HCC set)
+with many others.  Grouping them into equivalence classes first means each
+distinct profile is scored once and the scores broadcast back,
+
+    classes = ProfileClasses(indicators)
+    scores = coeffs.score(indicators, classes)
+    classes.dedup_ratio   # people per distinct profile
+
+"""
+import threading
+
+import numpy
+
+from hcc_risk_models.common.coefficients import coeff_loader
+
+
+class SegmentCoefficients:
+    """Dense segment x predictor coefficient matrix for one risk model
+
+    Predictor names are resolved to integer column arrays once, when the
+    model's tables are loaded, and the matrix is gathered from the
+    coefficients' own (segment x variable) matrix without building any
+    "<segment>_<predictor>" names.
+
+    Args:
+      coefficients (Coefficients): regression coefficients (or a dict
+                                   indexed by "<segment>_<predictor>" names)
+      segment_names (list): segment names in output order
+      segment_predictors (dict): segment name -> list of predictor names
+    """
+
+    def __init__(self, coefficients, segment_names, segment_predictors):
+        if not isinstance(coefficients, coeff_loader.Coefficients):
+            coefficients = coeff_loader.Coefficients.from_dict(coefficients)
+        self.segment_names = list(segment_names)
+
+        # union of all predictors, in order of first appearance
+        self.predictors = []
+        self.predictor_index = {}
+        for seg_name in self.segment_names:
+            for var in segment_predictors[seg_name]:
+                if var not in self.predictor_index:
+                    self.predictor_index[var] = len(self.predictors)
+                    self.predictors.append(var)
+
+        # segment name -> predictor columns, in segment predictor order
+        self.segment_columns = {
+            seg_name: numpy.array(
+                [self.predictor_index[var] for var in segment_predictors[seg_name]],
+                dtype=numpy.int64)
+            for seg_name in self.segment_names}
+
+        n_seg = len(self.segment_names)
+        n_pred = len(self.predictors)
+
+        # predictor column -> coefficient variable column
+        variable_columns = numpy.array(
+            [coefficients.variable_index.get(var, -1) for var in self.predictors],
+            dtype=numpy.int64)
+
+        # coefficient matrix (zero where a predictor is not in a segment) and
+        # the position of each predictor in its segment's predictor list.
+        # the positions let us accumulate coefficients in exactly the order
+        # the per-person loop did, so batch scores are bit-for-bit identical.
+        self.matrix = numpy.zeros((n_seg, n_pred))
+        self.positions = numpy.full((n_seg, n_pred), n_pred, dtype=numpy.int64)
+        self.in_segment = numpy.zeros((n_seg, n_pred), dtype=bool)
+        for iseg, seg_name in enumerate(self.segment_names):
+            cols = self.segment_columns[seg_name]
+            values = numpy.full(len(cols), numpy.nan)
+            if seg_name in coefficients.segment_index:
+                known = variable_columns[cols] >= 0
+                values[known] = coefficients.matrix[
+                    coefficients.segment_index[seg_name], variable_columns[cols[known]]]
+            missing = numpy.flatnonzero(numpy.isnan(values))
+            if len(missing):
+                raise KeyError('{}_{}'.format(seg_name, self.predictors[cols[missing[0]]]))
+            self.matrix[iseg, cols] = values
+            self.positions[iseg, cols] = numpy.arange(len(cols))
+            self.in_segment[iseg, cols] = True
+
+    def flagged_columns(self, preds):
+        """Return sorted column indices of the predictors flagged in `preds`"""
+        index = self.predictor_index
+        return sorted(
+            index[var] for var, value in preds.items()
+            if value == 1 and var in index)
+
+    def flagged_coefficients(self, cols):
+        """Return {segment name: {predictor name: coefficient}} for the
+        predictor columns `cols`, in segment predictor order"""
+        result = {}
+        for iseg, seg_name in enumerate(self.segment_names):
+            in_seg = [icol for icol in cols if self.in_segment[iseg, icol]]
+            in_seg.sort(key=lambda icol: self.positions[iseg, icol])
+            result[seg_name] = {
+                self.predictors[icol]: float(self.matrix[iseg, icol])
+                for icol in in_seg}
+        return result
+
+    def score(self, indicators, classes=None, initial=None):
+        """Multiply a `PredictorIndicators` matrix by the coefficient matrix
+
+        If `classes` (the ProfileClasses of `indicators`) is given only one
+        representative of each class is scored and its scores are copied
+        to the other members.
+
+        If `initial` (shape (n_people, n_segments), e.g. demographic scores
+        gathered from a DemographicTable) is given the flagged coefficients
+        are added to it.  Each segment's sum starts from `initial`, so if
+        the predictors behind `initial` come first in every segment the
+        scores are bit-for-bit those of scoring all predictors together.
+
+        Returns:
+          scores (numpy.ndarray): shape (n_people, n_segments)
+        """
+        rows, cols = indicators.to_arrays()
+        n_rows = indicators.n_rows
+        if classes is not None:
+            keep = classes.is_representative[rows]
+            rows = classes.inverse[rows[keep]]
+            cols = cols[keep]
+            n_rows = classes.n_classes
+            if initial is not None:
+                initial = initial[classes.representatives]
+
+        scores = numpy.zeros((n_rows, len(self.segment_names)))
+        for iseg in range(len(self.segment_names)):
+            # sort by person, then by predictor position within the segment
+            order = numpy.lexsort((self.positions[iseg, cols], rows))
+            seg_rows = rows[order]
+            weights = self.matrix[iseg, cols[order]]
+            if initial is not None:
+                # bincount adds in input order, so initial values go first
+                seg_rows = numpy.concatenate([numpy.arange(n_rows), seg_rows])
+                weights = numpy.concatenate([initial[:, iseg], weights])
+            scores[:, iseg] = numpy.bincount(seg_rows, weights=weights, minlength=n_rows)
+
+        if classes is not None:
+            scores = scores[classes.inverse]
+        return scores
+
+
+class PredictorIndicators:
+    """Sparse (person x predictor) 0/1 matrix stored in coordinate form
+
+    Args:
+      segment_coefficients (SegmentCoefficients): defines the predictor
+                                                  columns
+    """
+
+    def __init__(self, segment_coefficients):
+        self.segment_coefficients = segment_coefficients
+        self.rows = []
+        self.cols = []
+        self.n_rows = 0
+
+    def add_person(self, *preds_dicts):
+        """Append one row flagging every predictor equal to 1 in `preds_dicts`
+
+        Returns:
+          cols (list): one list of flagged predictor columns per element
+                       of `preds_dicts`
+        """
+        cols = []
+        for preds in preds_dicts:
+            pred_cols = self.segment_coefficients.flagged_columns(preds)
+            self.rows.extend([self.n_rows] * len(pred_cols))
+            self.cols.extend(pred_cols)
+            cols.append(pred_cols)
+        self.n_rows += 1
+        return cols
+
+    def add_columns(self, *cols):
+        """Append one row flagging the predictor columns in each of `cols`
+        (lists of columns as returned by add_person)"""
+        for pred_cols in cols:
+            self.rows.extend([self.n_rows] * len(pred_cols))
+            self.cols.extend(pred_cols)
+        self.n_rows += 1
+
+    def add_matrix(self, preds, names):
+        """Flag the predictors set in a (person x predictor) 0/1 matrix
+        whose rows are the people already added with add_person (rows
+        past those people are added as new people)
+
+        Args:
+          preds (numpy.ndarray): shape (n_people, len(names))
+          names (list): predictor name of each column of `preds`
+
+        Returns:
+          cols (list): list of flagged predictor columns of each person
+        """
+        index = self.segment_coefficients.predictor_index
+        columns = numpy.array([index.get(name, -1) for name in names], dtype=numpy.int64)
+        used = numpy.flatnonzero(columns >= 0)
+        rows, icols = numpy.nonzero(preds[:, used])
+        cols = columns[used[icols]]
+        self.rows.extend(rows.tolist())
+        self.cols.extend(cols.tolist())
+        self.n_rows = max(self.n_rows, len(preds))
+
+        # rows come out of nonzero() sorted, so each person's columns are
+        # one contiguous slice
+        bounds = numpy.searchsorted(rows, numpy.arange(len(preds) + 1)).tolist()
+        cols = cols.tolist()
+        return [cols[start:stop] for start, stop in zip(bounds[:-1], bounds[1:])]
+
+    def to_arrays(self):
+        """Return (rows, cols) integer index arrays of the non-zero entries"""
+        rows = numpy.array(self.rows, dtype=numpy.int64)
+        cols = numpy.array(self.cols, dtype=numpy.int64)
+        return rows, cols
+
+
+class ProfileClasses:
+    """Equivalence classes of the people in a `PredictorIndicators` matrix
+    with identical flagged predictors
+
+    Each person's row is packed into a bit string, and the bit strings are
+    grouped with numpy.unique, so finding the classes costs a sort of short
+    byte strings rather than a Python object per person.
+
+    Args:
+      indicators (PredictorIndicators): the population
+      groups (numpy.ndarray): optional integer label of each person (e.g.
+                              demographic cell) that must also match for
+                              two people to share a class
+
+    Attributes:
+      representatives (numpy.ndarray): first person of each class
+      inverse (numpy.ndarray): class of each person
+      is_representative (numpy.ndarray): True for the first person of
+                                         each class
+    """
+
+    def __init__(self, indicators, groups=None):
+        rows, cols = indicators.to_arrays()
+        n_pred = len(indicators.segment_coefficients.predictors)
+        n_bytes = max((n_pred + 7) // 8, 1)
+        packed = numpy.zeros((indicators.n_rows, n_bytes), dtype=numpy.uint8)
+        numpy.bitwise_or.at(
+            packed, (rows, cols >> 3), (128 >> (cols & 7)).astype(numpy.uint8))
+        if groups is not None:
+            labels = numpy.asarray(groups, dtype='>i8').reshape(-1, 1)
+            packed = numpy.hstack([packed, labels.view(numpy.uint8)])
+            n_bytes += 8
+        keys = packed.view(numpy.dtype((numpy.void, n_bytes))).ravel()
+
+        _, representatives, inverse = numpy.unique(
+            keys, return_index=True, return_inverse=True)
+        self.representatives = representatives.astype(numpy.int64)
+        self.inverse = inverse.reshape(-1).astype(numpy.int64)
+        self.is_representative = numpy.zeros(indicators.n_rows, dtype=bool)
+        self.is_representative[self.representatives] = True
+
+    @property
+    def n_people(self):
+        return len(self.inverse)
+
+    @property
+    def n_classes(self):
+        return len(self.representatives)
+
+    @property
+    def dedup_ratio(self):
+        """People per distinct profile (1.0 for an empty population)"""
+        if self.n_classes == 0:
+            return 1.0
+        return self.n_people / self.n_classes
+
+
+class ProfileCounts:
+    """Running totals of people scored and of distinct profiles among them
+
+    Kept by each model (`model.profile_counts`) to report how much scoring
+    work profile deduplication saves.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.n_people = 0
+        self.n_profiles = 0
+
+    def __getstate__(self):
+        return {'n_people': self.n_people, 'n_profiles': self.n_profiles}
+
+    def __setstate__(self, state):
+        self.__init__()
+        self.n_people = state['n_people']
+        self.n_profiles = state['n_profiles']
+
+    def add(self, n_people, n_profiles):
+        with self.lock:
+            self.n_people += n_people
+            self.n_profiles += n_profiles
+
+    def totals(self):
+        """Return (n_people, n_profiles)"""
+        with self.lock:
+            return self.n_people, self.n_profiles
+
+    @property
+    def dedup_ratio(self):
+        """People per distinct profile (1.0 before anything is scored)"""
+        n_people, n_profiles = self.totals()
+        if n_profiles == 0:
+            return 1.0
+        return n_people / n_profiles
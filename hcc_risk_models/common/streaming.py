@@ -0,0 +1,458 @@
+"""
+Evaluate risk models on populations that do not fit in memory.
+
+Demographics and diagnoses are read in chunks and spilled to temporary
+files, partitioned by a hash of pt_id so that every patient's demographics
+and diagnoses land in the same partition.  Each partition is then loaded
+and scored on its own, and its result is yielded before the next one is
+read,
+
+    chunks = evaluate_risk_stream(
+        model, 'demographics.csv', 'diagnoses.csv', memory_budget=2**30)
+    for result in chunks:
+        ...   # same structure as the result of model.evaluate_risk
+
+The budget applies to the estimated working set of each evaluate_risk
+call: the in-memory size of a partition's DataFrames (measured as they are
+spilled) times WORKING_SET_FACTOR.  Partitions whose working set would not
+fit in `memory_budget` are split again (with a different hash) until they
+do, so the size of what is scored at once depends on the budget and not
+on the size of the population.  A partition that cannot be split (one
+patient with more diagnoses than fit) or that still does not fit after
+MAX_DEPTH splits is scored over budget, with a warning logged, rather than
+aborting a stream that has already yielded results.  The resident memory
+of the process is not measured, so the budget is an estimate, not a hard
+limit on peak RSS.  Patients are yielded in partition order, not in input
+order.
+
+Inputs that are already sorted by pt_id (the contract of the SAS macros)
+need no partitioning.  `evaluate_risk_sorted` merge-joins person and
+diagnosis records in a single pass, holding only the current batch of
+patients in memory.  pt_ids are compared as they are (strings for CSV
+records, so in lexicographic order) unless a sort key such as int is
+given,
+
+    persons = csv.DictReader(open('persons.csv'))
+    diagnoses = csv.DictReader(open('diagnoses.csv'))
+    for result in evaluate_risk_sorted(model, persons, diagnoses):
+        ...
+"""
+import logging
+import math
+import os
+import pickle
+import shutil
+import tempfile
+
+import numpy
+import pandas
+
+from hcc_risk_models.common import grouping
+from hcc_risk_models.common import parallel
+
+
+logger = logging.getLogger(__name__)
+
+#: default memory budget in bytes
+DEFAULT_MEMORY_BUDGET = 512 * 2**20
+
+#: default number of rows read from an input at a time
+DEFAULT_CHUNKSIZE = 100000
+
+#: default number of patients scored at a time from sorted inputs
+DEFAULT_BATCH_SIZE = 10000
+
+#: in-memory size of a partition while it is being scored, relative to the
+#: size of its input DataFrames (per-patient results are much larger than
+#: the rows they are built from)
+WORKING_SET_FACTOR = 10
+
+#: in-memory size of a DataFrame read from CSV/NDJSON or from a (compressed)
+#: Parquet file relative to the file size (only used to choose the first
+#: number of partitions; partitions are then checked by their measured size)
+CSV_EXPANSION = 4
+PARQUET_EXPANSION = 10
+
+#: number of partitions when the input size can not be estimated, and the
+#: largest number of partitions written at once
+DEFAULT_FANOUT = 64
+MAX_FANOUT = 256
+
+#: number of times a partition is split again before it is scored over
+#: budget
+MAX_DEPTH = 4
+
+CSV_DTYPES = {'pt_id': str, 'diag_code': str}
+DIAGNOSES_COLUMNS = ['pt_id', 'diag_code', 'diag_type']
+
+
+def read_chunks(source, chunksize=DEFAULT_CHUNKSIZE):
+    """Yield DataFrame chunks from `source`
+
+    Args:
+      source: a file path, a DataFrame or an iterable of DataFrames.  Files
+              are read as CSV, Parquet (.parquet, .pq) or NDJSON (.ndjson,
+              .jsonl) depending on their extension.  pt_id and diag_code
+              columns in CSV and NDJSON files are read as strings.
+      chunksize (int): rows per chunk for files and DataFrames
+    """
+    if isinstance(source, pandas.DataFrame):
+        for start in range(0, len(source), chunksize):
+            yield source.iloc[start:start + chunksize]
+    elif isinstance(source, str):
+        file_format = input_format(source)
+        if file_format == 'csv':
+            reader = pandas.read_csv(source, chunksize=chunksize, dtype=CSV_DTYPES)
+        elif file_format == 'ndjson':
+            reader = pandas.read_json(
+                source, lines=True, chunksize=chunksize, dtype=CSV_DTYPES)
+        else:
+            reader = _read_parquet_chunks(source, chunksize)
+        for chunk in reader:
+            yield chunk
+    else:
+        for chunk in source:
+            yield chunk
+
+
+def input_format(path):
+    """Return 'csv', 'parquet' or 'ndjson' depending on the extension of `path`"""
+    ext = os.path.splitext(path)[1].lower()
+    if ext in ('.parquet', '.pq'):
+        return 'parquet'
+    if ext in ('.ndjson', '.jsonl'):
+        return 'ndjson'
+    return 'csv'
+
+
+def _read_parquet_chunks(path, chunksize):
+    """Yield DataFrame chunks from a Parquet file
+
+    Row batches are read one at a time if pyarrow is installed, otherwise
+    the file is read with pandas.read_parquet and then split into chunks.
+    """
+    try:
+        import pyarrow.parquet
+    except ImportError:
+        for chunk in read_chunks(pandas.read_parquet(path), chunksize):
+            yield chunk
+        return
+    parquet_file = pyarrow.parquet.ParquetFile(path)
+    for batch in parquet_file.iter_batches(batch_size=chunksize):
+        yield batch.to_pandas()
+
+
+def iter_records(source, chunksize=DEFAULT_CHUNKSIZE):
+    """Yield one dict per row of `source` (see read_chunks)"""
+    for chunk in read_chunks(source, chunksize):
+        for record in chunk.to_dict('records'):
+            yield record
+
+
+def estimate_bytes(source):
+    """Return the estimated in-memory size of `source` in bytes (or None)"""
+    if isinstance(source, pandas.DataFrame):
+        return int(source.memory_usage(deep=True).sum())
+    if isinstance(source, str):
+        if input_format(source) == 'parquet':
+            return os.path.getsize(source) * PARQUET_EXPANSION
+        return os.path.getsize(source) * CSV_EXPANSION
+    return None
+
+
+def choose_fanout(n_bytes, memory_budget):
+    """Return the number of partitions needed to fit `n_bytes` in the budget"""
+    if n_bytes is None:
+        return DEFAULT_FANOUT
+    n_parts = int(math.ceil(float(n_bytes) * WORKING_SET_FACTOR / memory_budget))
+    return min(max(n_parts, 1), MAX_FANOUT)
+
+
+def _partition_path(dirname, name, key):
+    return os.path.join(dirname, '{}-{}.pkl'.format(name, key))
+
+
+def _spill(chunks, dirname, name, fanout, depth):
+    """Append each chunk, split by partition, to pickle files in `dirname`
+
+    Returns:
+      sizes (numpy.ndarray): in-memory bytes written to each partition
+      n_rows (numpy.ndarray): rows written to each partition
+    """
+    sizes = numpy.zeros(fanout, dtype=numpy.int64)
+    n_rows = numpy.zeros(fanout, dtype=numpy.int64)
+    files = {}
+    try:
+        for chunk in chunks:
+            keys = grouping.partition_keys(chunk['pt_id'], fanout, depth)
+            for key, part in chunk.groupby(keys, sort=False):
+                if key not in files:
+                    files[key] = open(_partition_path(dirname, name, key), 'wb')
+                pickle.dump(part, files[key], pickle.HIGHEST_PROTOCOL)
+                sizes[key] += part.memory_usage(deep=True).sum()
+                n_rows[key] += len(part)
+    finally:
+        for fp in files.values():
+            fp.close()
+    return sizes, n_rows
+
+
+def _remove(*paths):
+    for path in paths:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def _read_pickles(path):
+    """Yield every DataFrame appended to the pickle file `path`"""
+    if not os.path.exists(path):
+        return
+    with open(path, 'rb') as fp:
+        while True:
+            try:
+                yield pickle.load(fp)
+            except EOFError:
+                break
+
+
+def _load(paths, columns=None):
+    """Return the concatenated DataFrames in the pickle files `paths`"""
+    parts = [part for path in paths for part in _read_pickles(path)]
+    if not parts:
+        return pandas.DataFrame(columns=columns)
+    return pandas.concat(parts, ignore_index=True)
+
+
+def _evaluate_files(model, demo_paths, diag_paths, kwargs):
+    """Load and score a group of partitions, then delete their files"""
+    demographics = _load(demo_paths)
+    diagnoses = _load(diag_paths, columns=DIAGNOSES_COLUMNS)
+    _remove(*(demo_paths + diag_paths))
+    return model.evaluate_risk(demographics, diagnoses, **kwargs)
+
+
+def _evaluate_partitions(model, dirname, demo_sizes, diag_sizes, demo_rows,
+                         depth, memory_budget, kwargs):
+    """Score the partitions in `dirname`
+
+    Small partitions are grouped so each evaluate_risk call gets as many
+    patients as fit in the budget, and partitions that are too large are
+    split further.  A partition of one patient (`demo_rows` are the
+    demographics rows of each partition) or one that was split MAX_DEPTH
+    times is scored on its own even if it does not fit.
+    """
+    group_demo_paths = []
+    group_diag_paths = []
+    group_bytes = 0
+    for key in range(len(demo_sizes)):
+        demo_path = _partition_path(dirname, 'demographics', key)
+        diag_path = _partition_path(dirname, 'diagnoses', key)
+        n_bytes = demo_sizes[key] + diag_sizes[key]
+
+        if demo_sizes[key] == 0:
+            # diagnoses of patients without demographics are never scored
+            _remove(demo_path, diag_path)
+            continue
+
+        if n_bytes * WORKING_SET_FACTOR > memory_budget:
+            if demo_rows[key] <= 1 or depth >= MAX_DEPTH:
+                logger.warning(
+                    'scoring %d patient(s) over the memory budget: they need an '
+                    'estimated %d bytes, more than the budget of %d bytes',
+                    demo_rows[key], n_bytes * WORKING_SET_FACTOR, memory_budget)
+                yield _evaluate_files(model, [demo_path], [diag_path], kwargs)
+                continue
+            subdir = os.path.join(dirname, str(key))
+            os.mkdir(subdir)
+            fanout = choose_fanout(n_bytes, memory_budget)
+            sub_demo_sizes, sub_demo_rows = _spill(
+                _read_pickles(demo_path), subdir, 'demographics', fanout, depth + 1)
+            sub_diag_sizes, _ = _spill(
+                _read_pickles(diag_path), subdir, 'diagnoses', fanout, depth + 1)
+            _remove(demo_path, diag_path)
+            for result in _evaluate_partitions(
+                    model, subdir, sub_demo_sizes, sub_diag_sizes, sub_demo_rows,
+                    depth + 1, memory_budget, kwargs):
+                yield result
+            continue
+
+        if group_demo_paths and (
+                (group_bytes + n_bytes) * WORKING_SET_FACTOR > memory_budget):
+            yield _evaluate_files(model, group_demo_paths, group_diag_paths, kwargs)
+            group_demo_paths = []
+            group_diag_paths = []
+            group_bytes = 0
+        group_demo_paths.append(demo_path)
+        group_diag_paths.append(diag_path)
+        group_bytes += n_bytes
+
+    if group_demo_paths:
+        yield _evaluate_files(model, group_demo_paths, group_diag_paths, kwargs)
+
+
+def evaluate_risk_stream(model, demographics, diagnoses, do_sedits=True,
+                         date_asof=None, output='dict', verbosity='full',
+                         memory_budget=DEFAULT_MEMORY_BUDGET,
+                         chunksize=DEFAULT_CHUNKSIZE, tmpdir=None, workers=1):
+    """Evaluate `model` chunk by chunk and yield one result per chunk
+
+    Args:
+      model: a risk model instance (e.g. from registry.get_model)
+      demographics: file path, DataFrame or iterable of DataFrames
+      diagnoses: file path, DataFrame or iterable of DataFrames
+      do_sedits, date_asof, output, verbosity: passed to model.evaluate_risk
+      workers (int): processes scoring each chunk; one pool of them is
+                     started for the whole stream
+      memory_budget (int): bytes the estimated working set of scoring one
+                           chunk must fit in (see the module docstring)
+      chunksize (int): rows read from an input at a time
+      tmpdir (str): directory for the temporary partition files
+
+    Yields:
+      result: the model.evaluate_risk result for one chunk of patients
+    """
+    n_bytes = None
+    demo_bytes = estimate_bytes(demographics)
+    diag_bytes = estimate_bytes(diagnoses)
+    if demo_bytes is not None and diag_bytes is not None:
+        n_bytes = demo_bytes + diag_bytes
+    fanout = choose_fanout(n_bytes, memory_budget)
+
+    dirname = tempfile.mkdtemp(prefix='hcc_stream_', dir=tmpdir)
+    pool = None
+    try:
+        pool = _start_pool(model, workers)
+        kwargs = {'do_sedits': do_sedits, 'date_asof': date_asof,
+                  'output': output, 'verbosity': verbosity, 'pool': pool}
+        demo_sizes, demo_rows = _spill(
+            read_chunks(demographics, chunksize), dirname, 'demographics', fanout, 0)
+        diag_sizes, _ = _spill(
+            read_chunks(diagnoses, chunksize), dirname, 'diagnoses', fanout, 0)
+        for result in _evaluate_partitions(
+                model, dirname, demo_sizes, diag_sizes, demo_rows, 0,
+                memory_budget, kwargs):
+            yield result
+    finally:
+        _stop_pool(pool)
+        shutil.rmtree(dirname, ignore_errors=True)
+
+
+def _start_pool(model, workers):
+    """Return the parallel.WorkerPool that scores every chunk of a stream
+    (None for a single process)"""
+    if workers > 1:
+        return parallel.WorkerPool(model, workers)
+    return None
+
+
+def _stop_pool(pool):
+    # every chunk has been scored (or scoring failed), so no worker is busy
+    if pool is not None:
+        pool.terminate()
+
+
+def _next_sorted(records, previous_key, key):
+    """Return the next record and its key, checking keys do not decrease"""
+    record = next(records, None)
+    if record is None:
+        return None, None
+    record_key = key(record['pt_id'])
+    if record_key < previous_key:
+        raise ValueError(
+            'diagnoses are not sorted by pt_id ({!r} after {!r})'.format(
+                record_key, previous_key))
+    return record, record_key
+
+
+def _identity(pt_id):
+    return pt_id
+
+
+def merge_join(persons, diagnoses, key=None):
+    """Pair each person with their diagnoses in one pass over sorted inputs
+
+    Both inputs are iterables of records (e.g. dicts from csv.DictReader)
+    with a 'pt_id' key, sorted by pt_id.  Diagnoses of pt_ids that have no
+    person record are skipped, as in the SAS merge.
+
+    pt_ids are compared as they are, so the string pt_ids of CSV records
+    must be sorted lexicographically ('1', '10', '2').  For inputs sorted
+    some other way pass the sort key as `key` (e.g. int for numerically
+    sorted pt_ids); pt_ids with equal keys are joined.
+
+    Yields:
+      person, person_diagnoses: a person record and a list of its
+                                diagnosis records
+    """
+    if key is None:
+        key = _identity
+    diagnoses = iter(diagnoses)
+    diag = next(diagnoses, None)
+    diag_key = None if diag is None else key(diag['pt_id'])
+    last_key = None
+    for person in persons:
+        pt_key = key(person['pt_id'])
+        if last_key is not None and not last_key < pt_key:
+            raise ValueError(
+                'persons are not sorted by unique pt_id ({!r} after {!r})'.format(
+                    pt_key, last_key))
+        last_key = pt_key
+
+        while diag is not None and diag_key < pt_key:
+            diag, diag_key = _next_sorted(diagnoses, diag_key, key)
+        person_diagnoses = []
+        while diag is not None and diag_key == pt_key:
+            person_diagnoses.append(diag)
+            diag, diag_key = _next_sorted(diagnoses, diag_key, key)
+
+        yield person, person_diagnoses
+
+
+def _evaluate_batch(model, persons, diagnoses, kwargs):
+    """Score a batch of person and diagnosis records"""
+    demographics = pandas.DataFrame.from_records(persons)
+    diagnoses = pandas.DataFrame.from_records(diagnoses, columns=DIAGNOSES_COLUMNS)
+    # records from CSV readers hold strings
+    diagnoses['diag_type'] = diagnoses['diag_type'].astype(int)
+    return model.evaluate_risk(demographics, diagnoses, **kwargs)
+
+
+def evaluate_risk_sorted(model, persons, diagnoses, do_sedits=True,
+                         date_asof=None, output='dict', verbosity='full',
+                         batch_size=DEFAULT_BATCH_SIZE, workers=1, key=None):
+    """Evaluate `model` on person and diagnosis records sorted by pt_id
+
+    Args:
+      model: a risk model instance (e.g. from registry.get_model)
+      persons: iterable of demographics records (one per pt_id)
+      diagnoses: iterable of diagnosis records
+      do_sedits, date_asof, output, verbosity: passed to model.evaluate_risk
+      workers (int): processes scoring each batch; one pool of them is
+                     started for the whole input
+      batch_size (int): patients scored (and held in memory) at a time
+      key (callable): sort key of the pt_ids (see merge_join; by default
+                      string pt_ids are in lexicographic order)
+
+    Yields:
+      result: the model.evaluate_risk result for one batch of patients;
+              batches are yielded in input order
+    """
+    pool = _start_pool(model, workers)
+    kwargs = {'do_sedits': do_sedits, 'date_asof': date_asof,
+              'output': output, 'verbosity': verbosity, 'pool': pool}
+
+    try:
+        batch_persons = []
+        batch_diagnoses = []
+        for person, person_diagnoses in merge_join(persons, diagnoses, key):
+            batch_persons.append(person)
+            batch_diagnoses.extend(person_diagnoses)
+            if len(batch_persons) >= batch_size:
+                yield _evaluate_batch(model, batch_persons, batch_diagnoses, kwargs)
+                batch_persons = []
+                batch_diagnoses = []
+
+        if batch_persons:
+            yield _evaluate_batch(model, batch_persons, batch_diagnoses, kwargs)
+    finally:
+        _stop_pool(pool)
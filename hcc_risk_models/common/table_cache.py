@@ -0,0 +1,67 @@
+"""
+Process-wide cache of model tables keyed by the content of their source
+files.
+
+Several models read the same data files (V2216_79_O2 and V2216_79_L1 both
+use F221690P.csv and the 2016 ICD-10 / v32 ICD-9 descriptions, V2216_79_O2
+and V2217_79_O1 both use C2214O5P.csv).  Loading tables through this cache
+means each file is parsed and held once per process, whichever models
+reference it,
+
+    FORMATS = lazy.LazyTable(
+        lambda cls: table_cache.load(f221690p.HccFormats, FORMATS_FILE))
+
+Tables are keyed by the loader and the SHA-256 of the source files, so two
+copies of the same file share a table and an edited file gets a new one.
+Cached tables are shared between models and must be treated as read-only.
+"""
+import threading
+
+from hcc_risk_models.common import artifacts
+
+
+_tables = {}
+_locks = {}
+_lock = threading.Lock()
+
+
+def table_key(loader, sources):
+    """Return the cache key of the table `loader(*sources)`"""
+    name = '{}.{}'.format(loader.__module__, loader.__qualname__)
+    return name, artifacts.sources_sha256(list(sources))
+
+
+def load(loader, *sources):
+    """Return `loader(*sources)`, loading it only once per distinct loader
+    and source file contents
+
+    Args:
+      loader (callable): table class or function, called with the source
+                         file paths
+      sources (str): paths of the source files
+    """
+    key = table_key(loader, sources)
+    table = _tables.get(key)
+    if table is not None:
+        return table
+
+    with _lock:
+        key_lock = _locks.setdefault(key, threading.Lock())
+    with key_lock:
+        table = _tables.get(key)
+        if table is None:
+            table = loader(*sources)
+            _tables[key] = table
+    return table
+
+
+def cached_keys():
+    """Return the (loader name, source SHA-256) keys of the cached tables"""
+    return sorted(_tables)
+
+
+def clear():
+    """Drop every cached table (tables already held by models are kept)"""
+    with _lock:
+        _tables.clear()
+        _locks.clear()
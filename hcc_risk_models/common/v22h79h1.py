@@ -9,6 +9,7 @@
 
  **********************************************************************;
 """
+import numpy
 
 
 # map priority of HCC codes
@@ -47,20 +48,62 @@ HCC_HIER_DICT = {
 }
 
 
+#: highest condition category number
+N_CC = 201
+
+
+def compile_hierarchy(hier_dict, n_cc=N_CC):
+    """Compile a hierarchy dict (e.g. `HCC_HIER_DICT`) for fast application
+
+    Returns:
+      dominance (numpy.ndarray): boolean matrix of shape (n_cc+1, n_cc+1).
+                                 dominance[i, j] is True if CC i zeroes CC j
+      zero_masks (dict): CC -> integer bitmask of the CCs it zeroes
+    """
+    dominance = numpy.zeros((n_cc + 1, n_cc + 1), dtype=bool)
+    zero_masks = {}
+    for itop, izeros in hier_dict.items():
+        mask = 0
+        for izero in izeros:
+            dominance[itop, izero] = True
+            mask |= 1 << izero
+        zero_masks[itop] = mask
+    return dominance, zero_masks
+
+
+# every CC zeroed by a CC is also zeroed by anything above it in
+# `HCC_HIER_DICT`, so "zero every CC dominated by a flagged CC" gives the
+# same result as applying the SAS %SET0 statements one after another.
+DOMINANCE, ZERO_MASKS = compile_hierarchy(HCC_HIER_DICT)
+
+
 def impose_hierarchy(CC):
-    """Takes a condition category list (CC[5]=1 means condition category
+    """Takes a condition category array (CC[5]=1 means condition category
     5 is flagged) and imposes the hierarchy defined in `HCC_HIER_DICT`
+
+    `CC` is either one person's array of length N_CC+1 or a population
+    matrix of shape (n_people, N_CC+1).  The hierarchy is imposed on all
+    rows at once and an HCC array of the same shape is returned.
     """
-    # first copy the CC array into the HCC array
-    hcc = cc.copy()
+    cc = numpy.asarray(CC)
+    dominated = numpy.dot(cc != 0, DOMINANCE)
+    hcc = numpy.where(dominated, 0, cc)
+    return hcc
 
-    # now impose the hiearchy
-    for itop, izeros in HCC_HIER_DICT.items():
-        if hcc[itop] == 1 and cc[itop] == 1:
-            for izero in izeros:
-                hcc[izero] = 0
 
-    return hcc
+def zeroed_ccs_mask(ccs):
+    """Return the bitmask of condition categories zeroed by the CCs in `ccs`"""
+    zeroed = 0
+    for cc in ccs:
+        zeroed |= ZERO_MASKS.get(cc, 0)
+    return zeroed
+
+
+def apply_hierarchy(ccs):
+    """Return the set of HCCs left after imposing the hierarchy on the
+    collection of condition category numbers `ccs`"""
+    zeroed = zeroed_ccs_mask(ccs)
+    return set(cc for cc in ccs if not (zeroed >> cc) & 1)
 
 
 def impose_hierarchy_2(diags_to_hccs):
@@ -74,27 +117,15 @@ def impose_hierarchy_2(diags_to_hccs):
            'assign_type': assign_type,
        }
 
+    Each object gets an 'hcc' key equal to its 'cc' or to 0 if the CC is
+    zeroed by another CC in the list.
     """
-    # add initial Hierarchical Condition Categories
-    # (HCCs) that are copies of the CCs
+    zeroed = zeroed_ccs_mask(set(el['cc'] for el in diags_to_hccs))
     for el in diags_to_hccs:
-        el['hcc'] = el['cc']
-
-    # now impose the hiearchy
-    for itop, izeros in HCC_HIER_DICT.items():
-
-        # do we have this itop?
-        have_itop = False
-        for d2h in diags_to_hccs:
-            if d2h['cc'] == itop:
-                have_itop = True
-
-        # if we do, reset all the izeros
-        if have_itop:
-            for izero in izeros:
-                for d2h in diags_to_hccs:
-                    if d2h['cc'] == izero:
-                        d2h['hcc'] = 0
+        if (zeroed >> el['cc']) & 1:
+            el['hcc'] = 0
+        else:
+            el['hcc'] = el['cc']
 
     return diags_to_hccs
 
@@ -103,9 +134,10 @@ def impose_hierarchy_2(diags_to_hccs):
 
 if __name__ == '__main__':
 
-    CC = [0] * (201 + 1)  # all zeros
+    CC = [0] * (N_CC + 1)  # all zeros
     CC[17] = CC[18] = CC[19] = 1
     HCC = impose_hierarchy(CC)
+    assert apply_hierarchy([17, 18, 19]) == set([17])
 
 
     diags_to_hccs = [
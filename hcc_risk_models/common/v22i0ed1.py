@@ -39,6 +39,9 @@ CHECK2 = set(['J410', 'J411', 'J418', 'J42',  'J430', 'J431', 'J432',
 CHECK3 = set(['49320', '49321', '49322'])
 DIAG_TYPE = 0
 
+#: codes whose edits below depend on age or sex (besides the MCE lists)
+AGE_SEX_CODES = CHECK1 | CHECK2
+
 def icd10_edits(cc, age, sex, diag, sedits, hcc_formats):
 
     if sex == 2 and diag in CHECK1:
@@ -38,6 +38,9 @@ CHECK2 = set(['4910', '4911', '49120', '49121', '49122', '4918',
 CHECK3 = set(['49320', '49321', '49322'])
 DIAG_TYPE = 9
 
+#: codes whose edits below depend on age or sex (besides the MCE lists)
+AGE_SEX_CODES = CHECK1 | CHECK2 | CHECK3
+
 def icd9_edits(cc, age, sex, diag, sedits, hcc_formats):
 
     # /* Hemophilia for women */
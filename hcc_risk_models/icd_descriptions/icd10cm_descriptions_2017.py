@@ -1,43 +1,71 @@
 import os
 import pandas
 
+from hcc_risk_models.common import artifacts
+from hcc_risk_models.common import flat
+
 
 PATH_HERE = os.path.realpath(__file__)
 DIR_HERE = os.path.split(PATH_HERE)[0]
 DEFAULT_ORDER_FNAME = os.path.join(DIR_HERE, 'icd10cm_order_2017.txt')
 
 
+#: layout version of the compiled descriptions artifact
+ARTIFACT_VERSION = 1
+
+
+def read_order_file(fname):
+    """Read the order file into a DataFrame indexed by code"""
+    df = pandas.read_fwf(
+        fname,
+        header=None,
+        colspecs=[(0,5), (6,13), (14,15), (16,76), (77,500)],
+        names=['order_number', 'code', 'is_valid', 'short_description',
+               'long_description']
+    )
+
+    # set `code` as index
+    return df.set_index('code')
+
+
 class Icd10CmDefinitions:
 
     def __init__(self, fname=DEFAULT_ORDER_FNAME):
 
-        # read order file
-        df = pandas.read_fwf(
-            fname,
-            header=None,
-            colspecs=[(0,5), (6,13), (14,15), (16,76), (77,500)],
-            names=['order_number', 'code', 'is_valid', 'short_description',
-                   'long_description']
-        )
+        # descriptions are kept in flat arrays memory-mapped from the
+        # compiled artifact (the order file is only parsed if the artifact
+        # is missing or out of date)
+        arrays = artifacts.load_or_build(
+            fname, 'icd10cm', ARTIFACT_VERSION,
+            lambda: flat.CodeTable.build_arrays(read_order_file(fname)))
+        self.table = flat.CodeTable(arrays)
+        self._df = None
 
-        # set `code` as index
-        df = df.set_index('code')
-        self.df = df
+    @property
+    def df(self):
+        """DataFrame of the order file indexed by code (built on first use)"""
+        if self._df is None:
+            self._df = self.table.to_frame()
+        return self._df
 
     def return_short_description(self, code):
-        return self.df.loc[code, 'short_description']
+        return self.table.get(code, 'short_description')
 
     def return_long_description(self, code):
-        return self.df.loc[code, 'long_description']
+        return self.table.get(code, 'long_description')
 
     def return_json(self):
         icd_json = []
-        for row in self.df.itertuples():
+        for code, short_description, long_description, is_valid in zip(
+                self.table.codes.tolist(),
+                self.table.column_list('short_description'),
+                self.table.column_list('long_description'),
+                self.table.column_list('is_valid')):
             icd_json.append({
-                'code': row.Index,
-                'short_description': row.short_description,
-                'long_description': row.long_description,
-                'is_valid': row.is_valid,
+                'code': code,
+                'short_description': short_description,
+                'long_description': long_description,
+                'is_valid': is_valid,
             })
         return icd_json
 
@@ -1,6 +1,9 @@
 import os
 import pandas
 
+from hcc_risk_models.common import artifacts
+from hcc_risk_models.common import flat
+
 
 PATH_HERE = os.path.realpath(__file__)
 DIR_HERE = os.path.split(PATH_HERE)[0]
@@ -8,45 +11,77 @@ DEFAULT_LONG_FNAME = os.path.join(DIR_HERE, 'CMS32_DESC_LONG_DX.txt')
 DEFAULT_SHORT_FNAME = os.path.join(DIR_HERE, 'CMS32_DESC_SHORT_DX.txt')
 
 
+#: layout version of the compiled descriptions artifact
+ARTIFACT_VERSION = 1
+
+
+def read_description_files(fname_long, fname_short):
+    """Read the short and long description files into a DataFrame indexed
+    by code"""
+
+    # the files are Latin-1 encoded, not UTF-8
+
+    # read short descriptions
+    short_defs = pandas.read_fwf(
+        fname_short,
+        header=None,
+        colspecs=[(0,5), (6,500)],
+        names=['code', 'short_description'],
+        encoding='latin-1'
+    )
+
+    # read long descriptions
+    long_defs = pandas.read_fwf(
+        fname_long,
+        header=None,
+        colspecs=[(0,5), (6,500)],
+        names=['code', 'long_description'],
+        encoding='latin-1'
+    )
+
+    df = pandas.merge(short_defs, long_defs, on='code')
+    return df.set_index('code')
+
+
 class Icd9CmDefinitions:
 
     def __init__(self,
                  fname_long=DEFAULT_LONG_FNAME,
                  fname_short=DEFAULT_SHORT_FNAME):
 
-        # read short descriptions
-        short_defs = pandas.read_fwf(
-            fname_short,
-            header=None,
-            colspecs=[(0,5), (6,500)],
-            names=['code', 'short_description']
-        )
-
-        # read long descriptions
-        long_defs = pandas.read_fwf(
-            fname_long,
-            header=None,
-            colspecs=[(0,5), (6,500)],
-            names=['code', 'long_description']
-        )
-
-        df = pandas.merge(short_defs, long_defs, on='code')
-        df = df.set_index('code')
-        self.df = df
+        # descriptions are kept in flat arrays memory-mapped from the
+        # compiled artifact (the text files are only parsed if the artifact
+        # is missing or out of date)
+        arrays = artifacts.load_or_build(
+            [fname_long, fname_short], 'icd9cm', ARTIFACT_VERSION,
+            lambda: flat.CodeTable.build_arrays(
+                read_description_files(fname_long, fname_short)))
+        self.table = flat.CodeTable(arrays)
+        self._df = None
+
+    @property
+    def df(self):
+        """DataFrame of the descriptions indexed by code (built on first use)"""
+        if self._df is None:
+            self._df = self.table.to_frame()
+        return self._df
 
     def return_short_description(self, code):
-        return self.df.loc[code, 'short_description']
+        return self.table.get(code, 'short_description')
 
     def return_long_description(self, code):
-        return self.df.loc[code, 'long_description']
+        return self.table.get(code, 'long_description')
 
     def return_json(self):
         icd_json = []
-        for row in self.df.itertuples():
+        for code, short_description, long_description in zip(
+                self.table.codes.tolist(),
+                self.table.column_list('short_description'),
+                self.table.column_list('long_description')):
             icd_json.append({
-                'code': row.Index,
-                'short_description': row.short_description,
-                'long_description': row.long_description,
+                'code': code,
+                'short_description': short_description,
+                'long_description': long_description,
             })
         return icd_json
 
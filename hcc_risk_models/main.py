@@ -1,19 +1,15 @@
 import argparse
-from hcc_risk_models.v2217_79_O1 import risk_model as v2217_79_O1
-from hcc_risk_models.v2216_79_O2 import risk_model as v2216_79_O2
-
-
-model_v2217_79_O1 = v2217_79_O1.V2217_79_O1()
-model_v2216_79_O2 = v2216_79_O2.V2216_79_O2()
+from hcc_risk_models import registry
+from hcc_risk_models.common import streaming
 
 
 VALID_MODEL_DESCRIPTIONS = {
-    'V2217_79_O1': 'CMS-HCC 2017 Midyear Final Model, 79 HCC Variables',
-    'V2216_79_O2': 'CMS-HCC 2017 Initial Model, 79 HCC Variables',
-}
+    name: description
+    for name, (_, _, description) in registry.MODEL_CLASSES.items()}
 
 
-def evaluate_model(model, demographics, diagnoses, do_sedits=False, date_asof=None):
+def evaluate_model(model, demographics, diagnoses, do_sedits=False, date_asof=None,
+                   as_json=False, output='dict', verbosity='full', workers=1):
     """Evaluate a risk model for every person in the demographics DataFrame
 
         The demographics DataFrame has one row per person.  Different
@@ -27,24 +23,72 @@ def evaluate_model(model, demographics, diagnoses, do_sedits=False, date_asof=No
           diag_code - ICD-9 or ICD-10 diagnosis code with no periods
           diag_type - 9 for ICD-9 codes, 0 for ICD-10 codes
 
+        If `as_json` is True the result is returned as UTF-8 encoded JSON
+        bytes instead of a dict.  If `output` is 'frame' the scores and HCC
+        flags are returned as DataFrames (see the model's evaluate_risk).
+        `verbosity` is one of 'scores', 'hccs' or 'full' and controls how
+        much explanation is built for each patient.  With `workers` > 1
+        patients are scored in a pool of that many processes.
+
     """
 
-    if model not in VALID_MODEL_DESCRIPTIONS:
-        raise ValueError(
-            'model must be one of: {}'.format(VALID_MODEL_DESCRIPTIONS.keys()))
+    model = _get_valid_model(model)
 
-    if model == 'V2217_79_O1':
-        model = model_v2217_79_O1
+    result = model.evaluate_risk(
+        demographics, diagnoses, do_sedits=do_sedits, date_asof=date_asof,
+        as_json=as_json, output=output, verbosity=verbosity, workers=workers)
 
-    elif model == 'V2216_79_O2':
-        model = model_v2216_79_O2
+    return result
 
-    else:
-        raise ValueError('model must be one of {}'.format(
-            list(VALID_MODEL_DESCRIPTIONS)))
 
+def evaluate_model_stream(model, demographics, diagnoses, do_sedits=False,
+                          date_asof=None, output='dict', verbosity='full',
+                          memory_budget=streaming.DEFAULT_MEMORY_BUDGET,
+                          chunksize=streaming.DEFAULT_CHUNKSIZE, tmpdir=None,
+                          workers=1):
+    """Evaluate a risk model chunk by chunk for populations larger than memory
 
-    result = model.evaluate_risk(
-        demographics, diagnoses, do_sedits=do_sedits, date_asof=date_asof)
+        `demographics` and `diagnoses` are CSV, Parquet or NDJSON paths,
+        DataFrames or iterables of DataFrames with the columns described in
+        evaluate_model.  One result (as returned by evaluate_model) is
+        yielded per chunk of patients, each chunk sized so its estimated
+        working set fits in `memory_budget` bytes.  See
+        common/streaming.py for details.
 
-    return result
+    """
+    model = _get_valid_model(model)
+
+    return streaming.evaluate_risk_stream(
+        model, demographics, diagnoses, do_sedits=do_sedits, date_asof=date_asof,
+        output=output, verbosity=verbosity, memory_budget=memory_budget,
+        chunksize=chunksize, tmpdir=tmpdir, workers=workers)
+
+
+def evaluate_model_sorted(model, persons, diagnoses, do_sedits=False,
+                          date_asof=None, output='dict', verbosity='full',
+                          batch_size=streaming.DEFAULT_BATCH_SIZE, workers=1,
+                          key=None):
+    """Evaluate a risk model on person and diagnosis records sorted by pt_id
+
+        `persons` and `diagnoses` are iterables of records (e.g. dicts from
+        csv.DictReader) sorted by pt_id, as the SAS macros expect.  They
+        are merge-joined in a single pass and one result (as returned by
+        evaluate_model) is yielded per `batch_size` patients.  pt_ids are
+        compared as they are (so string pt_ids must be in lexicographic
+        order) unless a sort `key` such as int is given.
+
+    """
+    model = _get_valid_model(model)
+
+    return streaming.evaluate_risk_sorted(
+        model, persons, diagnoses, do_sedits=do_sedits, date_asof=date_asof,
+        output=output, verbosity=verbosity, batch_size=batch_size,
+        workers=workers, key=key)
+
+
+def _get_valid_model(model):
+    """Return the model instance for the name `model`"""
+    registry.REGISTRY.validate_name(model)
+
+    # models are loaded on first use and reused afterwards
+    return registry.get_model(model)
@@ -0,0 +1,99 @@
+"""
+Registry of risk models keyed by model name.
+
+Model modules are only imported, and model tables only read from disk,
+the first time a model is requested.  Each model is loaded at most once
+per process (guarded by a per-model lock) and the same instance is handed
+out on every later request,
+
+    model = get_model('V2217_79_O1')   # slow the first time, then cached
+    REGISTRY.timings()                 # seconds spent loading each model
+
+"""
+import importlib
+import threading
+import time
+
+from hcc_risk_models.common import lazy
+
+
+#: model name -> (module path, class name, description).  The one list of
+#: models: main.VALID_MODEL_DESCRIPTIONS, the CLI and the API derive from it.
+MODEL_CLASSES = {
+    'V2217_79_O1': ('hcc_risk_models.v2217_79_O1.risk_model', 'V2217_79_O1',
+                    'CMS-HCC 2017 Midyear Final Model, 79 HCC Variables'),
+    'V2216_79_O2': ('hcc_risk_models.v2216_79_O2.risk_model', 'V2216_79_O2',
+                    'CMS-HCC 2017 Initial Model, 79 HCC Variables'),
+    'V2216_79_L1': ('hcc_risk_models.v2216_79_L1.risk_model', 'V2216_79_L1',
+                    'CMS-HCC 2016 Model, 79 HCC Variables'),
+}
+
+
+class ModelRegistry:
+    """Loads model instances on first use and caches them
+
+    Args:
+      model_classes (dict): model name -> (module path, class name,
+                            description)
+    """
+
+    def __init__(self, model_classes):
+        self.model_classes = dict(model_classes)
+        self._models = {}
+        self._locks = {name: threading.Lock() for name in self.model_classes}
+        self._load_times = {}
+
+    def validate_name(self, name):
+        """Raise ValueError if `name` is not a registered model"""
+        if name not in self.model_classes:
+            raise ValueError('model must be one of {}'.format(
+                sorted(self.model_classes)))
+
+    def get_model_class(self, name):
+        """Import and return the model class for `name` (tables not loaded)"""
+        self.validate_name(name)
+        module_path, class_name = self.model_classes[name][:2]
+        module = importlib.import_module(module_path)
+        return getattr(module, class_name)
+
+    def get_model(self, name):
+        """Return the model instance for `name`, loading its tables if needed"""
+        model = self._models.get(name)
+        if model is not None:
+            return model
+
+        self.validate_name(name)
+        with self._locks[name]:
+            model = self._models.get(name)
+            if model is None:
+                time_start = time.time()
+                model = self.get_model_class(name)()
+                table_times = model.load()
+                self._load_times[name] = {
+                    'total': time.time() - time_start,
+                    'tables': table_times,
+                }
+                self._models[name] = model
+        return model
+
+    def warm(self, names=None):
+        """Load the models in `names` (default all) and return their timings"""
+        if names is None:
+            names = sorted(self.model_classes)
+        for name in names:
+            self.get_model(name)
+        return {name: self._load_times[name] for name in names}
+
+    def is_loaded(self, name):
+        """Return True if the model `name` and all of its tables are loaded"""
+        model = self._models.get(name)
+        return model is not None and lazy.tables_loaded(type(model))
+
+    def timings(self):
+        """Return {model name: {'total': seconds, 'tables': {...}}} for every
+        model loaded so far"""
+        return dict(self._load_times)
+
+
+REGISTRY = ModelRegistry(MODEL_CLASSES)
+get_model = REGISTRY.get_model
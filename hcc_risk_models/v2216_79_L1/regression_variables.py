@@ -73,6 +73,59 @@ DIAG_CAT = [
     'COPD',  'RENAL',   'COMPL', 'SEPSIS','PRESSURE_ULCER'
 ]
 
+# %*HCCs that flag each diagnostic category (a category is flagged if any
+# of its HCCs is);
+DIAG_CAT_HCCS = {
+    'CANCER':         ['HCC8', 'HCC9', 'HCC10', 'HCC11', 'HCC12'],
+    'DIABETES':       ['HCC17', 'HCC18', 'HCC19'],
+    'IMMUNE':         ['HCC47'],
+    'CHF':            ['HCC85'],
+    'CARD_RESP_FAIL': ['HCC82', 'HCC83', 'HCC84'],
+    'COPD':           ['HCC110', 'HCC111'],
+    'RENAL':          ['HCC134', 'HCC135', 'HCC136', 'HCC137'],
+    'COMPL':          ['HCC176'],
+    'SEPSIS':         ['HCC2'],
+    'PRESSURE_ULCER': ['HCC157', 'HCC158'],  # /*10/19/2012*/
+}
+
+# %*interaction variables as the product of two factors (HCCs, diagnostic
+# categories or DISABL);
+INTERACTIONS = {
+    # %*interactions ;
+    'SEPSIS_CARD_RESP_FAIL':        ('SEPSIS', 'CARD_RESP_FAIL'),
+    'CANCER_IMMUNE':                ('CANCER', 'IMMUNE'),
+    'DIABETES_CHF':                 ('DIABETES', 'CHF'),
+    'CHF_COPD':                     ('CHF', 'COPD'),
+    'CHF_RENAL':                    ('CHF', 'RENAL'),
+    'COPD_CARD_RESP_FAIL':          ('COPD', 'CARD_RESP_FAIL'),
+
+    # %*interactions with disabled ;
+    'DISABLED_HCC6':                ('DISABL', 'HCC6'),    # %*Opportunistic Infections;
+    'DISABLED_HCC34':               ('DISABL', 'HCC34'),   # %*Chronic Pancreatitis;
+    'DISABLED_HCC46':               ('DISABL', 'HCC46'),   # %*Severe Hematol Disorders;
+    'DISABLED_HCC54':               ('DISABL', 'HCC54'),   # %*Drug/Alcohol Psychosis;
+    'DISABLED_HCC55':               ('DISABL', 'HCC55'),   # %*Drug/Alcohol Dependence;
+    'DISABLED_HCC110':              ('DISABL', 'HCC110'),  # %*Cystic Fibrosis;
+    'DISABLED_HCC176':              ('DISABL', 'HCC176'),  # %* added 7/2009;
+
+    # %*institutional model;
+    'SEPSIS_PRESSURE_ULCER':        ('SEPSIS', 'PRESSURE_ULCER'),
+    'SEPSIS_ARTIF_OPENINGS':        ('SEPSIS', 'HCC188'),
+    'ART_OPENINGS_PRESSURE_ULCER':  ('HCC188', 'PRESSURE_ULCER'),
+    'COPD_ASP_SPEC_BACT_PNEUM':     ('COPD', 'HCC114'),
+    'ASP_SPEC_BACT_PNEUM_PRES_ULC': ('HCC114', 'PRESSURE_ULCER'),
+    'SEPSIS_ASP_SPEC_BACT_PNEUM':   ('SEPSIS', 'HCC114'),
+    'SCHIZOPHRENIA_COPD':           ('HCC57', 'COPD'),
+    'SCHIZOPHRENIA_CHF':            ('HCC57', 'CHF'),
+    'SCHIZOPHRENIA_SEIZURES':       ('HCC57', 'HCC79'),
+
+    'DISABLED_HCC85':               ('DISABL', 'HCC85'),
+    'DISABLED_PRESSURE_ULCER':      ('DISABL', 'PRESSURE_ULCER'),
+    'DISABLED_HCC161':              ('DISABL', 'HCC161'),
+    'DISABLED_HCC39':               ('DISABL', 'HCC39'),
+    'DISABLED_HCC77':               ('DISABL', 'HCC77'),
+}
+
 # %*orig disabled interactions for Community Aged regressions;
 ORIG_INT = ['OriginallyDisabled_Female', 'OriginallyDisabled_Male']
 
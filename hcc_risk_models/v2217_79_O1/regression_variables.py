@@ -86,6 +86,55 @@ DIAG_CAT = [
     'SEPSIS','PRESSURE_ULCER','gSubstanceAbuse','gPsychiatric'
 ]
 
+# %*HCCs that flag each diagnostic category (a category is flagged if any
+# of its HCCs is);
+DIAG_CAT_HCCS = {
+    'CANCER':          ['HCC8', 'HCC9', 'HCC10', 'HCC11', 'HCC12'],
+    'DIABETES':        ['HCC17', 'HCC18', 'HCC19'],
+    'CHF':             ['HCC85'],
+    'CARD_RESP_FAIL':  ['HCC82', 'HCC83', 'HCC84'],
+    'gCopdCF':         ['HCC110', 'HCC111', 'HCC112'],
+    'RENAL':           ['HCC134', 'HCC135', 'HCC136', 'HCC137'],
+    'SEPSIS':          ['HCC2'],
+    'PRESSURE_ULCER':  ['HCC157', 'HCC158'],  # /*10/19/2012*/
+    'gSubstanceAbuse': ['HCC54', 'HCC55'],
+    'gPsychiatric':    ['HCC57', 'HCC58'],
+}
+
+# %*interaction variables as the product of two factors (HCCs, diagnostic
+# categories or DISABL);
+INTERACTIONS = {
+    # %*community models interactions ;
+    'HCC47_gCancer':                ('HCC47', 'CANCER'),
+    'HCC85_gDiabetesMellit':        ('HCC85', 'DIABETES'),
+    'HCC85_gCopdCF':                ('HCC85', 'gCopdCF'),
+    'HCC85_gRenal':                 ('HCC85', 'RENAL'),
+    'gRespDepandArre_gCopdCF':      ('CARD_RESP_FAIL', 'gCopdCF'),
+    'HCC85_HCC96':                  ('HCC85', 'HCC96'),
+    'gSubstanceAbuse_gPsychiatric': ('gSubstanceAbuse', 'gPsychiatric'),
+
+    # %*institutional model;
+    'CHF_gCopdCF':                  ('CHF', 'gCopdCF'),
+    'gCopdCF_CARD_RESP_FAIL':       ('gCopdCF', 'CARD_RESP_FAIL'),
+    'SEPSIS_PRESSURE_ULCER':        ('SEPSIS', 'PRESSURE_ULCER'),
+    'SEPSIS_ARTIF_OPENINGS':        ('SEPSIS', 'HCC188'),
+    'ART_OPENINGS_PRESSURE_ULCER':  ('HCC188', 'PRESSURE_ULCER'),
+    'DIABETES_CHF':                 ('DIABETES', 'CHF'),
+    'gCopdCF_ASP_SPEC_BACT_PNEUM':  ('gCopdCF', 'HCC114'),
+    'ASP_SPEC_BACT_PNEUM_PRES_ULC': ('HCC114', 'PRESSURE_ULCER'),
+    'SEPSIS_ASP_SPEC_BACT_PNEUM':   ('SEPSIS', 'HCC114'),
+    'SCHIZOPHRENIA_gCopdCF':        ('HCC57', 'gCopdCF'),
+    'SCHIZOPHRENIA_CHF':            ('HCC57', 'CHF'),
+    'SCHIZOPHRENIA_SEIZURES':       ('HCC57', 'HCC79'),
+
+    'DISABLED_HCC85':               ('DISABL', 'HCC85'),
+    'DISABLED_PRESSURE_ULCER':      ('DISABL', 'PRESSURE_ULCER'),
+    'DISABLED_HCC161':              ('DISABL', 'HCC161'),
+    'DISABLED_HCC39':               ('DISABL', 'HCC39'),
+    'DISABLED_HCC77':               ('DISABL', 'HCC77'),
+    'DISABLED_HCC6':                ('DISABL', 'HCC6'),
+}
+
 # %*orig disabled interactions for Community Aged regressions;
 ORIG_INT = ['OriginallyDisabled_Female', 'OriginallyDisabled_Male']
 
@@ -17,6 +17,9 @@ setup(
     package_data = {
         '': ['*.csv', '*.txt'],
     },
+    entry_points = {
+        'console_scripts': ['hcc-score = hcc_risk_models.cli:main'],
+    },
 
 
 )
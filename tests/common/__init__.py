@@ -0,0 +1,14 @@
+
+class CountingModel:
+    """Stand-in model that counts the diagnoses of each patient"""
+
+    def load(self):
+        return {}
+
+    def evaluate_risk(self, demographics, diagnoses, as_json=False, **kwargs):
+        counts = diagnoses.groupby('pt_id').size()
+        return {
+            'model_info': {'model_name': 'COUNTING', 'n_patients': len(demographics)},
+            'patients': [{'pt_id': pt_id, 'n_diags': int(counts.get(pt_id, 0))}
+                         for pt_id in demographics['pt_id']],
+        }
@@ -1,4 +1,5 @@
 import unittest
+import numpy
 from hcc_risk_models.common import agesexv2
 
 class TestParseAgeSexVar(unittest.TestCase):
@@ -127,6 +128,33 @@ class TestCreateNecell(unittest.TestCase):
             self.assertEqual(expected, v)
 
 
+class TestArrayVariants(unittest.TestCase):
+    """Test vectorized create_*_array functions."""
+
+    def test_cell_arrays(self):
+        """agesexv2 - test create_cell_array and create_necell_array."""
+        ages = numpy.tile(numpy.arange(-1, 110), 3)
+        sexes = numpy.repeat([0, 1, 2], 111)
+        cells = agesexv2.create_cell_array(ages, sexes)
+        necells = agesexv2.create_necell_array(ages, sexes)
+        for irow, (age, sex) in enumerate(zip(ages, sexes)):
+            cell = agesexv2.create_cell(age, sex)
+            necell = agesexv2.create_necell(age, sex)
+            self.assertEqual([cell[k] for k in agesexv2.AGESEXV], list(cells[irow]))
+            self.assertEqual([necell[k] for k in agesexv2.NE_AGESEXV], list(necells[irow]))
+
+    def test_disabl_origds_arrays(self):
+        """agesexv2 - test create_disabl_array and create_origds_array."""
+        ages = numpy.array([63, 63, 63, 63, 65, 65, 65, 65])
+        orecs = numpy.array([0, 1, 2, 3, 0, 1, 2, 3])
+        disabl = agesexv2.create_disabl_array(ages, orecs)
+        origds = agesexv2.create_origds_array(disabl, orecs)
+        self.assertEqual(
+            [agesexv2.create_disabl(a, o) for a, o in zip(ages, orecs)], list(disabl))
+        self.assertEqual(
+            [agesexv2.create_origds(d, o) for d, o in zip(disabl, orecs)], list(origds))
+
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,76 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy
+
+from hcc_risk_models.common import artifacts
+
+
+class TestLoadOrBuild(unittest.TestCase):
+    """Test function load_or_build."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.source = os.path.join(self.directory, 'SOURCE.csv')
+        with open(self.source, 'w') as fp:
+            fp.write('A,1\nB,2\n')
+        self.n_builds = 0
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def build(self):
+        self.n_builds += 1
+        arrays = {}
+        with open(self.source) as fp:
+            lookup = dict(
+                (key, int(value)) for key, value in
+                (line.strip().split(',') for line in fp))
+        artifacts.add_lookup(arrays, 'lookup', lookup)
+        return arrays
+
+    def load(self):
+        arrays = artifacts.load_or_build(
+            self.source, 'test', 1, self.build, directory=self.directory)
+        return artifacts.get_lookup(arrays, 'lookup')
+
+    def test_build_once(self):
+        """artifacts - test the artifact is built once and then reused."""
+        self.assertEqual({'A': 1, 'B': 2}, self.load())
+        self.assertEqual({'A': 1, 'B': 2}, self.load())
+        self.assertEqual(1, self.n_builds)
+
+    def test_rebuild_on_change(self):
+        """artifacts - test the artifact is rebuilt when the source changes."""
+        self.load()
+        with open(self.source, 'a') as fp:
+            fp.write('C,3\n')
+        self.assertEqual({'A': 1, 'B': 2, 'C': 3}, self.load())
+        self.assertEqual(2, self.n_builds)
+
+    def test_memory_mapped(self):
+        """artifacts - test artifact arrays are aligned read-only memory maps."""
+        self.load()
+        arrays = artifacts.load_or_build(
+            self.source, 'test', 1, self.build, directory=self.directory)
+        for array in arrays.values():
+            self.assertIsInstance(array.base, numpy.memmap)
+            self.assertFalse(array.flags.writeable)
+            self.assertTrue(array.flags.aligned)
+
+
+class TestLookupArrays(unittest.TestCase):
+    """Test functions add_lookup and get_lookup."""
+
+    def test_tuples(self):
+        """artifacts - test lookups with tuple values round trip."""
+        arrays = {}
+        artifacts.add_lookup(arrays, 'ages', {'C9332': (0, 64), 'P000': (0, 0)})
+        self.assertEqual({'C9332': (0, 64), 'P000': (0, 0)},
+                         artifacts.get_lookup(arrays, 'ages'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import contextlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import pandas
+
+from hcc_risk_models import cli
+
+
+class TestParseSize(unittest.TestCase):
+    """Test function parse_size."""
+
+    def test_units(self):
+        """cli - test parse_size."""
+        self.assertEqual(1000, cli.parse_size('1000'))
+        self.assertEqual(512 * 2**20, cli.parse_size('512MB'))
+        self.assertEqual(2 * 2**30, cli.parse_size('2g'))
+        self.assertEqual(1536, cli.parse_size('1.5K'))
+
+
+class TestMain(unittest.TestCase):
+    """Test function main end to end on small CSV files."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        # sorted numerically, not as strings
+        self.demographics = os.path.join(self.tmpdir, 'demographics.csv')
+        pandas.DataFrame({
+            'pt_id': [1, 2, 10],
+            'sex': [1, 2, 2],
+            'dob': ['1940-5-1', '1930-1-1', '1950-3-3'],
+            'ltimcaid': [0, 1, 0],
+            'nemcaid': [0, 0, 0],
+            'orec': [0, 1, 0],
+        }).to_csv(self.demographics, index=False)
+        self.diagnoses = os.path.join(self.tmpdir, 'diagnoses.csv')
+        pandas.DataFrame({
+            'pt_id': [1, 10, 10],
+            'diag_code': ['E119', 'I5022', 'N185'],
+            'diag_type': [0, 0, 0],
+        }).to_csv(self.diagnoses, index=False)
+        self.output = os.path.join(self.tmpdir, 'out')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def run_main(self, *options):
+        """Run the CLI on the test files and return its stderr"""
+        stderr = io.StringIO()
+        argv = ['V2217_79_O1', self.demographics, self.diagnoses,
+                '-o', self.output, '--date-asof', '2017-02-01'] + list(options)
+        with contextlib.redirect_stderr(stderr):
+            cli.main(argv)
+        return stderr.getvalue()
+
+    def test_csv(self):
+        """cli - test csv scores and the stderr summary."""
+        stderr = self.run_main('--format', 'csv')
+        scores = pandas.read_csv(self.output, index_col='pt_id')
+        self.assertEqual([1, 2, 10], sorted(scores.index))
+        self.assertIn('SCORE_COMMUNITY_NA', scores.columns)
+        self.assertIn('scored 3 patients (6 input rows)', stderr)
+        self.assertIn('patients/sec', stderr)
+        self.assertIn('distinct risk profiles:', stderr)
+        if cli.resource is not None:
+            self.assertIn('peak memory:', stderr)
+        self.assertNotIn('worker process', stderr)
+
+    def test_sorted_ndjson(self):
+        """cli - test --sorted with --numeric-ids and --workers."""
+        stderr = self.run_main('--sorted', '--numeric-ids', '--workers', '2',
+                               '--verbosity', 'hccs')
+        with open(self.output) as fp:
+            patients = [json.loads(line) for line in fp]
+        self.assertEqual(['1', '2', '10'], [p['pt_id'] for p in patients])
+        hccs = {p['pt_id']: sorted(el['hcc'] for el in p['diagnoses_to_hccs'])
+                for p in patients}
+        self.assertEqual({'1': [19], '2': [], '10': [85, 136]}, hccs)
+        self.assertIn('scored 3 patients', stderr)
+        if cli.resource is not None:
+            self.assertIn('largest exited worker process', stderr)
+
+    def test_numeric_ids_requires_sorted(self):
+        """cli - test --numeric-ids without --sorted is an error."""
+        with self.assertRaises(SystemExit):
+            self.run_main('--numeric-ids')
+
+
+if __name__ == '__main__':
+    unittest.main()
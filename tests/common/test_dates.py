@@ -0,0 +1,40 @@
+import datetime
+import unittest
+
+from dateutil import relativedelta
+
+from hcc_risk_models.common import dates
+
+
+class TestParseDates(unittest.TestCase):
+    """Test function parse_dates."""
+
+    def test_formats(self):
+        """dates - test parse_dates on strings and date objects."""
+        values = ['1930-8-21', '1930-08-21', datetime.date(1930, 8, 21), '08/21/1930']
+        years, months, days = dates.parse_dates(values)
+        self.assertEqual([1930] * 4, list(years))
+        self.assertEqual([8] * 4, list(months))
+        self.assertEqual([21] * 4, list(days))
+
+    def test_invalid_date(self):
+        """dates - test parse_dates rejects invalid dates."""
+        self.assertRaises(ValueError, dates.parse_dates, ['1951-2-29'])
+
+
+class TestAgeAsof(unittest.TestCase):
+    """Test function age_asof."""
+
+    def test_matches_relativedelta(self):
+        """dates - test age_asof matches relativedelta, leap days included."""
+        start = datetime.date(1947, 1, 1)
+        dobs = [start + datetime.timedelta(days=i) for i in range(0, 366 * 6)]
+        years, months, days = dates.parse_dates([dob.isoformat() for dob in dobs])
+        for date_asof in [datetime.date(1949, 2, 28), datetime.date(1950, 3, 1),
+                          datetime.date(1952, 2, 29), datetime.date(1951, 2, 28)]:
+            expected = [relativedelta.relativedelta(date_asof, dob).years for dob in dobs]
+            self.assertEqual(expected, list(dates.age_asof(years, months, days, date_asof)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import unittest
+
+from hcc_risk_models.common import agesexv2
+from hcc_risk_models.common import demographics
+from hcc_risk_models.common import scoring
+
+
+SEGMENT_NAMES = ['SEG1', 'SEG2']
+SEGMENT_PREDICTORS = {
+    'SEG1': ['MCAID', 'F65_69', 'M65_69'],
+    'SEG2': ['ORIGDS', 'F65_69', 'NEW'],
+}
+COEFFICIENTS = {
+    'SEG1_MCAID': 0.1, 'SEG1_F65_69': 0.2, 'SEG1_M65_69': 0.3,
+    'SEG2_ORIGDS': 1.5, 'SEG2_F65_69': 2.5, 'SEG2_NEW': 3.5,
+}
+
+
+def create_demographic_predictors(agef, sex, orec, medicaid, nemcaid):
+    """Small stand-in for a model's create_demographic_predictors."""
+    disabl = agesexv2.create_disabl(agef, orec)
+    preds = agesexv2.create_cell(agef, sex)
+    preds['MCAID'] = medicaid
+    preds['ORIGDS'] = agesexv2.create_origds(disabl, orec)
+    preds['NEW'] = nemcaid
+    return preds, disabl
+
+
+class TestDemographicTable(unittest.TestCase):
+    """Test class DemographicTable."""
+
+    def setUp(self):
+        self.coeffs = scoring.SegmentCoefficients(
+            COEFFICIENTS, SEGMENT_NAMES, SEGMENT_PREDICTORS)
+        self.table = demographics.DemographicTable(
+            create_demographic_predictors, self.coeffs)
+
+    def test_cells(self):
+        """demographics - test cells match the predictors of each person."""
+        people = [(67, 2, 1, 1, 0), (0, 1, 0, 0, 0), (50, 1, 1, 0, 1), (120, 2, 3, 1, 1)]
+        for person in people:
+            icell = self.table.cell(*person)
+            preds, disabl = create_demographic_predictors(*person)
+            self.assertEqual(self.coeffs.flagged_columns(preds), self.table.columns[icell])
+            self.assertEqual(disabl, self.table.disabl[icell])
+
+            indicators = scoring.PredictorIndicators(self.coeffs)
+            indicators.add_person(preds)
+            self.assertEqual(self.coeffs.score(indicators)[0].tolist(),
+                             self.table.scores[icell].tolist())
+
+        icells = self.table.cells(*zip(*people)).tolist()
+        self.assertEqual([self.table.cell(*person) for person in people], icells)
+
+    def test_outside(self):
+        """demographics - test values outside the table have no cell."""
+        for person in [(121, 1, 0, 0, 0), (-1, 1, 0, 0, 0), (70, 3, 0, 0, 0),
+                       (70, 1, 4, 0, 0), (70, 1, 0, 2, 0), (70, 1, 0, 0, -1)]:
+            self.assertEqual(-1, self.table.cell(*person))
+            self.assertEqual([-1], self.table.cells(*zip(person)).tolist())
+
+
+if __name__ == '__main__':
+    unittest.main()
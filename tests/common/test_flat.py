@@ -0,0 +1,64 @@
+import unittest
+
+import pandas
+
+from hcc_risk_models.common import flat
+
+
+class TestArrayLookup(unittest.TestCase):
+    """Test class ArrayLookup."""
+
+    def test_packed_keys(self):
+        """flat - test lookups on ICD codes packed into integers."""
+        lookup = {'E119': 19, 'E11': 18, 'I5022': 85, 'Z6841': 22}
+        keys, values = flat.sorted_lookup_arrays(lookup)
+        self.assertEqual('u', keys.dtype.kind)
+        array_lookup = flat.ArrayLookup(keys, values)
+        self.assertEqual(lookup, array_lookup)
+        self.assertEqual(['E11', 'E119', 'I5022', 'Z6841'], list(array_lookup))
+        self.assertEqual(19, array_lookup.get('E119'))
+        self.assertIsInstance(array_lookup['E119'], int)
+        for missing in ['E1', 'E1190', 'A00', 'Z9', '', None, 'E11ä']:
+            self.assertEqual(-1, array_lookup.get(missing, -1))
+            self.assertNotIn(missing, array_lookup)
+
+    def test_string_keys(self):
+        """flat - test lookups on keys too long to pack."""
+        lookup = {'LONG_KEY_1': (0, 17), 'LONG_KEY_2': (18, 64)}
+        keys, values = flat.sorted_lookup_arrays(lookup)
+        self.assertEqual('U', keys.dtype.kind)
+        array_lookup = flat.ArrayLookup(keys, values)
+        self.assertEqual(lookup, array_lookup)
+        self.assertEqual((18, 64), array_lookup['LONG_KEY_2'])
+        self.assertIsNone(array_lookup.get('LONG_KEY_3'))
+
+
+class TestCodeTable(unittest.TestCase):
+    """Test class CodeTable."""
+
+    def test_round_trip(self):
+        """flat - test a table of descriptions round trips."""
+        df = pandas.DataFrame({
+            'is_valid': [0, 1, 1],
+            'long_description': ['Cholera', 'Cholera due to vibrio cholerae',
+                                 "Friedländer's bacillus infection"],
+        }, index=pandas.Index(['001', '0010', '0413'], name='code'))
+        table = flat.CodeTable(flat.CodeTable.build_arrays(df.iloc[::-1]))
+        self.assertEqual("Friedländer's bacillus infection",
+                         table.get('0413', 'long_description'))
+        self.assertEqual(0, table.get('001', 'is_valid'))
+        with self.assertRaises(KeyError):
+            table.get('0011', 'long_description')
+        pandas.testing.assert_frame_equal(
+            df.iloc[::-1], table.to_frame(), check_dtype=False)
+
+    def test_missing_string(self):
+        """flat - test a missing string value is stored as ''."""
+        df = pandas.DataFrame({'long_description': ['Cholera', None]},
+                              index=pandas.Index(['001', '0010'], name='code'))
+        table = flat.CodeTable(flat.CodeTable.build_arrays(df))
+        self.assertEqual('', table.get('0010', 'long_description'))
+
+
+if __name__ == '__main__':
+    unittest.main()
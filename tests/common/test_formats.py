@@ -0,0 +1,27 @@
+import unittest
+
+from hcc_risk_models.common.formats import f221690p
+from hcc_risk_models.common.formats import f2217o1p
+
+
+class TestReadCsv(unittest.TestCase):
+    """Test method HccFormats.read_csv."""
+
+    def test_needed_tables(self):
+        """formats - test only the format tables a model uses are read."""
+        for module in [f221690p, f2217o1p]:
+            hcc_formats = module.HccFormats.__new__(module.HccFormats)
+            hcc_formats.fname = module.DEFAULT_FNAME
+            hcc_formats.read_csv()
+            self.assertEqual(set(module.FMTNAMES), set(hcc_formats.tables))
+            self.assertEqual(module.CSV_COLUMNS, hcc_formats.df.columns.tolist())
+            self.assertEqual(['FMTNAME', 'LABEL'],
+                             hcc_formats.tables['AGEL'].columns.tolist())
+            stats = hcc_formats.read_stats
+            self.assertEqual(len(hcc_formats.df), stats['rows_kept'])
+            self.assertLess(stats['rows_kept'], stats['rows_read'])
+            self.assertLess(stats['bytes_kept'], stats['bytes_read'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import unittest
+
+import pandas
+
+from hcc_risk_models.common import grouping
+
+
+class TestDiagnosisGroups(unittest.TestCase):
+    """Test class DiagnosisGroups."""
+
+    def setUp(self):
+        diagnoses = pandas.DataFrame({
+            'pt_id': [1002, 1001, 1002, 1003, 1002],
+            'diag_code': ['G030', 'A420', 'C7410', 'E1169', 'A4150'],
+            'diag_type': [0, 0, 9, 0, 0],
+        })
+        self.groups = grouping.DiagnosisGroups(diagnoses)
+
+    def test_get(self):
+        """grouping - test diagnoses are grouped in input order."""
+        diag_codes, diag_types = self.groups.get(1002)
+        self.assertEqual(['G030', 'C7410', 'A4150'], list(diag_codes))
+        self.assertEqual([0, 9, 0], list(diag_types))
+
+    def test_single_diagnosis(self):
+        """grouping - test a patient with a single diagnosis."""
+        diag_codes, diag_types = self.groups.get(1003)
+        self.assertEqual(['E1169'], list(diag_codes))
+        self.assertEqual([0], list(diag_types))
+
+    def test_missing_patient(self):
+        """grouping - test a patient with no diagnoses."""
+        self.assertEqual(3, len(self.groups))
+        self.assertFalse(1004 in self.groups)
+        diag_codes, diag_types = self.groups.get(1004)
+        self.assertEqual(0, len(diag_codes))
+        self.assertEqual(0, len(diag_types))
+
+
+class TestPartitionKeys(unittest.TestCase):
+    """Test function partition_keys."""
+
+    def test_int_and_str(self):
+        """grouping - test pt_ids hash the same as ints or strings."""
+        keys_int = grouping.partition_keys([1001, 1002, 1003], 16, 0)
+        keys_str = grouping.partition_keys(['1001', '1002', '1003'], 16, 0)
+        self.assertEqual(list(keys_int), list(keys_str))
+
+
+if __name__ == '__main__':
+    unittest.main()
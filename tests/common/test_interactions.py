@@ -0,0 +1,55 @@
+import unittest
+
+import numpy
+
+from hcc_risk_models.common import interactions
+
+
+HCC_NAMES = ['HCC2', 'HCC17', 'HCC18', 'HCC85', 'HCC157']
+DIAG_CAT_HCCS = {
+    'DIABETES': ['HCC17', 'HCC18'],
+    'CHF': ['HCC85'],
+}
+INTERACTIONS = {
+    'DIABETES_CHF': ('DIABETES', 'CHF'),
+    'SEPSIS_PRESSURE_ULCER': ('HCC2', 'HCC157'),
+    'DISABLED_HCC85': ('DISABL', 'HCC85'),
+}
+
+
+class TestDiagnosisPredictors(unittest.TestCase):
+    """Test class DiagnosisPredictors."""
+
+    def setUp(self):
+        self.table = interactions.DiagnosisPredictors(
+            HCC_NAMES, DIAG_CAT_HCCS, INTERACTIONS)
+
+    def test_hcc_matrix(self):
+        """interactions - test HCC numbers are flagged in their columns."""
+        hccs = self.table.hcc_matrix(3, [0, 0, 2, 2], [18, 85, 2, 999])
+        self.assertEqual(
+            [[0, 0, 1, 1, 0], [0, 0, 0, 0, 0], [1, 0, 0, 0, 0]], hccs.tolist())
+
+    def test_evaluate(self):
+        """interactions - test categories and interactions per person."""
+        hccs = numpy.array([
+            [0, 0, 1, 1, 0],
+            [1, 1, 0, 0, 1],
+            [0, 0, 0, 1, 0],
+            [0, 0, 0, 0, 0],
+        ], dtype=numpy.int8)
+        disabl = [1, 1, 0, 1]
+        preds = self.table.evaluate(hccs, disabl)
+        self.assertEqual(HCC_NAMES + list(INTERACTIONS), self.table.names)
+        self.assertEqual(hccs.tolist(), preds[:, :len(HCC_NAMES)].tolist())
+        self.assertEqual(
+            [[1, 0, 1], [0, 1, 0], [0, 0, 0], [0, 0, 0]],
+            preds[:, len(HCC_NAMES):].tolist())
+        self.assertEqual(
+            {'HCC2': 1, 'HCC17': 1, 'HCC18': 0, 'HCC85': 0, 'HCC157': 1,
+             'DIABETES_CHF': 0, 'SEPSIS_PRESSURE_ULCER': 1, 'DISABLED_HCC85': 0},
+            self.table.to_dict(preds[1]))
+
+
+if __name__ == '__main__':
+    unittest.main()
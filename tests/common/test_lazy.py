@@ -0,0 +1,33 @@
+import threading
+import unittest
+from hcc_risk_models.common import lazy
+
+
+class TestLazyTable(unittest.TestCase):
+    """Test class LazyTable."""
+
+    def test_loaded_once(self):
+        """lazy - test tables load once on first access."""
+        calls = []
+
+        class Model:
+            TABLE = lazy.LazyTable(lambda cls: calls.append(cls) or len(calls))
+            DERIVED = lazy.LazyTable(lambda cls: cls.TABLE * 10)
+
+        self.assertFalse(lazy.tables_loaded(Model))
+        self.assertEqual([], calls)
+
+        threads = [threading.Thread(target=lambda: Model.DERIVED) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual([Model], calls)
+        self.assertEqual(10, Model().DERIVED)
+        self.assertTrue(lazy.tables_loaded(Model))
+        self.assertEqual(['DERIVED', 'TABLE'], sorted(lazy.load_tables(Model)))
+
+
+if __name__ == '__main__':
+    unittest.main()
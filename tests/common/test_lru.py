@@ -0,0 +1,29 @@
+import pickle
+import unittest
+
+from hcc_risk_models.common import lru
+
+
+class TestLRUCache(unittest.TestCase):
+    """Test class LRUCache."""
+
+    def test_evict_and_count(self):
+        """lru - test least recently used entries are evicted first."""
+        cache = lru.LRUCache(2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        self.assertEqual(1, cache.get('a'))
+        cache.put('c', 3)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(1, cache.get('a'))
+        self.assertEqual(3, cache.get('c'))
+        self.assertEqual(
+            {'hits': 3, 'misses': 1, 'size': 2, 'maxsize': 2}, cache.info())
+
+        copy = pickle.loads(pickle.dumps(cache))
+        self.assertEqual(
+            {'hits': 0, 'misses': 0, 'size': 0, 'maxsize': 2}, copy.info())
+
+
+if __name__ == '__main__':
+    unittest.main()
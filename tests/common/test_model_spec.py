@@ -0,0 +1,98 @@
+import unittest
+
+from hcc_risk_models.common import model_spec
+from hcc_risk_models.common import risk_model
+from hcc_risk_models.v2216_79_L1 import risk_model as l1
+from hcc_risk_models.v2217_79_O1 import risk_model as o1
+
+
+def spec_args(spec, **kwargs):
+    """Return the arguments of `spec` with some of them replaced."""
+    args = {
+        'name': spec.name,
+        'description': spec.description,
+        'segments': spec.segments,
+        'regression_variables': spec.regression_variables,
+        'formats': spec.formats,
+        'coefficients': spec.coefficients,
+        'icd_descriptions': spec.icd_descriptions,
+        'edits': spec.edits,
+        'hierarchy': spec.hierarchy,
+        'hcc_descriptions': spec.hcc_descriptions,
+        'medicaid': spec.medicaid,
+        'medicaid_interactions': spec.medicaid_interactions,
+        'edit_codes': spec.edit_codes,
+    }
+    args.update(kwargs)
+    return args
+
+
+class TestModelSpec(unittest.TestCase):
+    """Test class ModelSpec."""
+
+    def test_validate(self):
+        """model_spec - test inconsistent specs are rejected."""
+        spec = o1.SPEC
+        with self.assertRaises(ValueError):
+            model_spec.ModelSpec(**spec_args(spec, segments=spec.segments[:-1]))
+        with self.assertRaises(ValueError):
+            model_spec.ModelSpec(**spec_args(spec, edits=dict(l1.SPEC.edits)))
+        with self.assertRaises(ValueError):
+            model_spec.ModelSpec(**spec_args(spec, medicaid='medicaid'))
+
+
+class TestCompileSpec(unittest.TestCase):
+    """Test function compile_spec and the RiskModel subclass hook."""
+
+    def test_plan(self):
+        """model_spec - test a compiled plan holds the model constants."""
+        self.assertEqual(['CE', 'INS', 'NE', 'SNPNE'], l1.V2216_79_L1.SEGMENT_NAMES)
+        self.assertEqual('Community', l1.V2216_79_L1.SEGMENT_DESCRIPTIONS['CE'])
+        self.assertEqual('mcaid', l1.V2216_79_L1.REQUIRED_DEMOGRAPHICS_COLUMNS[3])
+        self.assertEqual([0, 9], l1.V2216_79_L1.DIAG_TYPES)
+        self.assertEqual([0], o1.V2217_79_O1.DIAG_TYPES)
+        self.assertFalse(hasattr(o1.V2217_79_O1, 'ICD9_DEFS'))
+
+    def test_tables_per_class(self):
+        """model_spec - test every model class gets its own lazy tables."""
+
+        class Model(risk_model.RiskModel):
+            SPEC = model_spec.ModelSpec(**spec_args(o1.SPEC, name='TEST'))
+
+        self.assertEqual('TEST', Model.NAME)
+        self.assertIsNot(vars(Model)['SEGMENT_COEFFICIENTS'],
+                         vars(o1.V2217_79_O1)['SEGMENT_COEFFICIENTS'])
+
+        # the demographic predictors follow the spec
+        preds, disabl = l1.V2216_79_L1().create_demographic_predictors(50, 2, 1, 1, 0)
+        self.assertEqual(1, disabl)
+        self.assertEqual(1, preds['MCAID'])
+        self.assertEqual(1, preds['MCAID_Female_Disabled'])
+        preds, _ = Model().create_demographic_predictors(50, 2, 1, 1, 0)
+        self.assertEqual(1, preds['LTIMCAID'])
+        self.assertNotIn('MCAID_Female_Disabled', preds)
+
+
+class RestrictedFormats:
+    """Formats stand-in in which only 'N40' has MCE limits."""
+
+    def mce_restricted(self, diag_code, diag_type):
+        return diag_code == 'N40'
+
+
+class TestIcdCacheKey(unittest.TestCase):
+    """Test method RiskModel.icd_cache_key."""
+
+    def test_key(self):
+        """model_spec - test age and sex only key edit relevant codes."""
+        model = risk_model.RiskModel()
+        model.FORMATS = RestrictedFormats()
+        model.EDIT_CODES = {0: frozenset(['D66'])}
+        self.assertEqual(('E119', 0, True), model.icd_cache_key(70, 1, 'E119', 0, 1))
+        self.assertEqual(('D66', 0, False, 70, 2), model.icd_cache_key(70, 2, 'D66', 0, 0))
+        self.assertEqual(('N40', 0, True, 70, 1), model.icd_cache_key(70, 1, 'N40', 0, True))
+        self.assertEqual(('N40', 0, False), model.icd_cache_key(70, 1, 'N40', 0, False))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,38 @@
+import unittest
+
+import pandas
+
+from hcc_risk_models.common import parallel
+from tests.common import CountingModel
+
+
+class TestEvaluateRiskParallel(unittest.TestCase):
+    """Test function evaluate_risk_parallel."""
+
+    def setUp(self):
+        self.demographics = pandas.DataFrame({'pt_id': [5, 3, 9, 1, 7, 2, 8, 4, 6]})
+        self.diagnoses = pandas.DataFrame({
+            'pt_id': [1, 9, 9, 3, 7, 7, 7, 6],
+            'diag_code': ['A420'] * 8,
+            'diag_type': [0] * 8,
+        })
+        self.model = CountingModel()
+        self.expected = self.model.evaluate_risk(self.demographics, self.diagnoses)
+
+    def test_same_as_serial(self):
+        """parallel - test shard results are merged in input row order."""
+        result = parallel.evaluate_risk_parallel(
+            self.model, self.demographics, self.diagnoses, 3)
+        self.assertEqual(self.expected, result)
+
+    def test_pool(self):
+        """parallel - test one pool scores several batches."""
+        with parallel.WorkerPool(self.model, 2) as pool:
+            for _ in range(2):
+                result = parallel.evaluate_risk_parallel(
+                    self.model, self.demographics, self.diagnoses, 1, pool=pool)
+                self.assertEqual(self.expected, result)
+
+
+if __name__ == '__main__':
+    unittest.main()
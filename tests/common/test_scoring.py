@@ -0,0 +1,124 @@
+import unittest
+from hcc_risk_models.common import scoring
+
+
+SEGMENT_NAMES = ['SEG1', 'SEG2']
+SEGMENT_PREDICTORS = {
+    'SEG1': ['A', 'B', 'C'],
+    'SEG2': ['C', 'D'],
+}
+COEFFICIENTS = {
+    'SEG1_A': 0.1, 'SEG1_B': 0.2, 'SEG1_C': 0.3,
+    'SEG2_C': 1.5, 'SEG2_D': 2.5,
+}
+
+
+class TestSegmentCoefficients(unittest.TestCase):
+    """Test class SegmentCoefficients."""
+
+    def setUp(self):
+        self.coeffs = scoring.SegmentCoefficients(
+            COEFFICIENTS, SEGMENT_NAMES, SEGMENT_PREDICTORS)
+
+    def test_matrix(self):
+        """scoring - test coefficient matrix layout."""
+        self.assertEqual(['A', 'B', 'C', 'D'], self.coeffs.predictors)
+        self.assertEqual(
+            [[0.1, 0.2, 0.3, 0.0], [0.0, 0.0, 1.5, 2.5]],
+            self.coeffs.matrix.tolist())
+
+    def test_score(self):
+        """scoring - test batch scores match per-person sums."""
+        people = [
+            ({'A': 1, 'B': 0}, {'C': 1}),
+            ({}, {}),
+            ({'B': 1}, {'D': 1, 'E': 1}),
+        ]
+        indicators = scoring.PredictorIndicators(self.coeffs)
+        for demo_preds, diag_preds in people:
+            indicators.add_person(demo_preds, diag_preds)
+        scores = self.coeffs.score(indicators)
+
+        for ipt, (demo_preds, diag_preds) in enumerate(people):
+            for iseg, seg_name in enumerate(SEGMENT_NAMES):
+                expected = 0
+                for var in SEGMENT_PREDICTORS[seg_name]:
+                    if demo_preds.get(var) == 1 or diag_preds.get(var) == 1:
+                        expected += COEFFICIENTS['{}_{}'.format(seg_name, var)]
+                self.assertEqual(expected, scores[ipt, iseg])
+
+    def test_flagged_coefficients(self):
+        """scoring - test flagged coefficients per segment."""
+        indicators = scoring.PredictorIndicators(self.coeffs)
+        demo_cols, diag_cols = indicators.add_person({'A': 1}, {'C': 1, 'D': 1})
+        self.assertEqual(
+            {'SEG1': {'A': 0.1}, 'SEG2': {}},
+            self.coeffs.flagged_coefficients(demo_cols))
+        self.assertEqual(
+            {'SEG1': {'C': 0.3}, 'SEG2': {'C': 1.5, 'D': 2.5}},
+            self.coeffs.flagged_coefficients(diag_cols))
+
+    def test_segment_columns(self):
+        """scoring - test predictors are resolved to column index arrays."""
+        self.assertEqual([0, 1, 2], self.coeffs.segment_columns['SEG1'].tolist())
+        self.assertEqual([2, 3], self.coeffs.segment_columns['SEG2'].tolist())
+
+    def test_missing_coefficient(self):
+        """scoring - test a predictor without a coefficient raises KeyError."""
+        with self.assertRaises(KeyError):
+            scoring.SegmentCoefficients(
+                COEFFICIENTS, SEGMENT_NAMES, {'SEG1': ['A'], 'SEG2': ['A']})
+
+
+class TestProfileClasses(unittest.TestCase):
+    """Test class ProfileClasses."""
+
+    def test_dedup(self):
+        """scoring - test people with identical predictors are scored once."""
+        coeffs = scoring.SegmentCoefficients(
+            COEFFICIENTS, SEGMENT_NAMES, SEGMENT_PREDICTORS)
+        people = [
+            ({'A': 1}, {'C': 1}),
+            ({}, {}),
+            ({'A': 1}, {'C': 1}),
+            ({'B': 1}, {'D': 1}),
+            ({}, {}),
+            ({'A': 1}, {'C': 1}),
+        ]
+        indicators = scoring.PredictorIndicators(coeffs)
+        for demo_preds, diag_preds in people:
+            indicators.add_person(demo_preds, diag_preds)
+
+        classes = scoring.ProfileClasses(indicators)
+        self.assertEqual(3, classes.n_classes)
+        self.assertEqual(2.0, classes.dedup_ratio)
+        self.assertEqual([0, 1, 3], sorted(classes.representatives.tolist()))
+        inverse = classes.inverse.tolist()
+        self.assertEqual(inverse[0], inverse[2])
+        self.assertEqual(inverse[0], inverse[5])
+        self.assertEqual(inverse[1], inverse[4])
+        self.assertEqual(
+            coeffs.score(indicators).tolist(),
+            coeffs.score(indicators, classes).tolist())
+
+        # the demographic part as initial scores, told apart by group
+        demographic = scoring.PredictorIndicators(coeffs)
+        diagnosis = scoring.PredictorIndicators(coeffs)
+        for demo_preds, diag_preds in people:
+            demographic.add_person(demo_preds)
+            diagnosis.add_person(diag_preds)
+        groups = [0, 1, 0, 2, 1, 0]
+        classes = scoring.ProfileClasses(diagnosis, groups)
+        self.assertEqual(3, classes.n_classes)
+        self.assertEqual(
+            coeffs.score(indicators).tolist(),
+            coeffs.score(diagnosis, classes, initial=coeffs.score(demographic)).tolist())
+
+        counts = scoring.ProfileCounts()
+        counts.add(classes.n_people, classes.n_classes)
+        self.assertEqual((6, 3), counts.totals())
+        self.assertEqual(2.0, counts.dedup_ratio)
+
+
+if __name__ == '__main__':
+    unittest.main()
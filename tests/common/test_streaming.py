@@ -0,0 +1,90 @@
+import unittest
+
+import pandas
+
+from hcc_risk_models.common import streaming
+from tests.common import CountingModel
+
+
+class TestEvaluateRiskStream(unittest.TestCase):
+    """Test function evaluate_risk_stream."""
+
+    def setUp(self):
+        self.demographics = pandas.DataFrame({'pt_id': range(1000, 1300)})
+        self.diagnoses = pandas.DataFrame({
+            'pt_id': [1000 + (i * 7) % 350 for i in range(2000)],
+            'diag_code': ['A420'] * 2000,
+            'diag_type': [0] * 2000,
+        })
+
+    def test_chunks_cover_population(self):
+        """streaming - test every patient is scored once with all diagnoses."""
+        expected = CountingModel().evaluate_risk(self.demographics, self.diagnoses)
+        for memory_budget in [streaming.DEFAULT_MEMORY_BUDGET, 400000]:
+            n_chunks = 0
+            patients = []
+            for result in streaming.evaluate_risk_stream(
+                    CountingModel(), self.demographics, self.diagnoses,
+                    memory_budget=memory_budget, chunksize=128):
+                n_chunks += 1
+                patients.extend(result['patients'])
+            key = lambda patient: patient['pt_id']
+            self.assertEqual(sorted(expected['patients'], key=key),
+                             sorted(patients, key=key))
+        self.assertTrue(n_chunks > 1)
+
+    def test_budget_too_small(self):
+        """streaming - test partitions that never fit are scored with a warning."""
+        with self.assertLogs(streaming.logger, 'WARNING'):
+            patients = [patient for result in streaming.evaluate_risk_stream(
+                CountingModel(), self.demographics, self.diagnoses,
+                memory_budget=1000, chunksize=128) for patient in result['patients']]
+        self.assertEqual(len(self.demographics), len(patients))
+
+
+class TestEvaluateRiskSorted(unittest.TestCase):
+    """Test functions merge_join and evaluate_risk_sorted."""
+
+    def setUp(self):
+        self.persons = [{'pt_id': pt_id} for pt_id in ['A', 'B', 'D', 'E']]
+        self.diagnoses = [
+            {'pt_id': pt_id, 'diag_code': 'A420', 'diag_type': '0'}
+            for pt_id in ['A', 'A', 'C', 'D', 'D', 'D', 'F']]
+
+    def test_merge_join(self):
+        """streaming - test merge_join pairs persons with their diagnoses."""
+        joined = [(person['pt_id'], len(diags)) for person, diags in
+                  streaming.merge_join(self.persons, self.diagnoses)]
+        self.assertEqual([('A', 2), ('B', 0), ('D', 3), ('E', 0)], joined)
+
+    def test_unsorted_input(self):
+        """streaming - test merge_join rejects unsorted input."""
+        persons = list(reversed(self.persons))
+        self.assertRaises(ValueError, list, streaming.merge_join(persons, self.diagnoses))
+        diagnoses = list(self.diagnoses)
+        diagnoses[1], diagnoses[2] = diagnoses[2], diagnoses[1]
+        self.assertRaises(ValueError, list, streaming.merge_join(self.persons, diagnoses))
+
+    def test_key(self):
+        """streaming - test merge_join compares pt_ids by the sort key."""
+        persons = [{'pt_id': pt_id} for pt_id in ['2', '9', '10']]
+        diagnoses = [{'pt_id': pt_id} for pt_id in ['2', '10', '10']]
+        self.assertRaises(ValueError, list, streaming.merge_join(persons, diagnoses))
+        joined = [(person['pt_id'], len(diags)) for person, diags in
+                  streaming.merge_join(persons, diagnoses, key=int)]
+        self.assertEqual([('2', 1), ('9', 0), ('10', 2)], joined)
+
+    def test_batches(self):
+        """streaming - test evaluate_risk_sorted scores in batches."""
+        chunks = list(streaming.evaluate_risk_sorted(
+            CountingModel(), iter(self.persons), iter(self.diagnoses), batch_size=3))
+        self.assertEqual(2, len(chunks))
+        patients = [p for result in chunks for p in result['patients']]
+        self.assertEqual(
+            [{'pt_id': 'A', 'n_diags': 2}, {'pt_id': 'B', 'n_diags': 0},
+             {'pt_id': 'D', 'n_diags': 3}, {'pt_id': 'E', 'n_diags': 0}],
+            patients)
+
+
+if __name__ == '__main__':
+    unittest.main()
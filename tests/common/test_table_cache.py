@@ -0,0 +1,53 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from hcc_risk_models.common import table_cache
+
+
+class CountingTable:
+    """Table that counts how many times it is loaded."""
+
+    n_loads = 0
+
+    def __init__(self, fname):
+        CountingTable.n_loads += 1
+        with open(fname) as fp:
+            self.text = fp.read()
+
+
+class TestLoad(unittest.TestCase):
+    """Test function load."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        CountingTable.n_loads = 0
+        table_cache.clear()
+
+    def tearDown(self):
+        table_cache.clear()
+        shutil.rmtree(self.directory)
+
+    def write(self, name, text):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w') as fp:
+            fp.write(text)
+        return path
+
+    def test_shared_by_content(self):
+        """table_cache - test files with the same content share one table."""
+        table_a = table_cache.load(CountingTable, self.write('A.csv', 'x,1\n'))
+        table_b = table_cache.load(CountingTable, self.write('B.csv', 'x,1\n'))
+        self.assertIs(table_a, table_b)
+        self.assertEqual(1, CountingTable.n_loads)
+
+        table_c = table_cache.load(CountingTable, self.write('C.csv', 'x,2\n'))
+        self.assertIsNot(table_a, table_c)
+        self.assertEqual('x,2\n', table_c.text)
+        self.assertEqual(2, CountingTable.n_loads)
+        self.assertEqual(2, len(table_cache.cached_keys()))
+
+
+if __name__ == '__main__':
+    unittest.main()
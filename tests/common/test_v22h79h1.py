@@ -0,0 +1,58 @@
+import unittest
+
+import numpy
+
+from hcc_risk_models.common import v22h79h1
+
+
+def sequential_hierarchy(cc):
+    """Reference implementation applying HCC_HIER_DICT one entry at a time"""
+    hcc = list(cc)
+    for itop, izeros in v22h79h1.HCC_HIER_DICT.items():
+        if hcc[itop] == 1 and cc[itop] == 1:
+            for izero in izeros:
+                hcc[izero] = 0
+    return hcc
+
+
+class TestImposeHierarchy(unittest.TestCase):
+    """Test function impose_hierarchy."""
+
+    def test_single_person(self):
+        """v22h79h1 - test impose_hierarchy on one CC array."""
+        cc = [0] * (v22h79h1.N_CC + 1)
+        cc[17] = cc[18] = cc[19] = 1
+        hcc = v22h79h1.impose_hierarchy(cc)
+        self.assertEqual([17], list(numpy.flatnonzero(hcc)))
+
+    def test_population(self):
+        """v22h79h1 - test impose_hierarchy on a population CC matrix."""
+        rng = numpy.random.RandomState(0)
+        ccs = sorted(set(v22h79h1.HCC_HIER_DICT) |
+                     set(z for zs in v22h79h1.HCC_HIER_DICT.values() for z in zs))
+        cc = numpy.zeros((500, v22h79h1.N_CC + 1), dtype=int)
+        cc[:, ccs] = rng.randint(0, 2, size=(500, len(ccs)))
+
+        hcc = v22h79h1.impose_hierarchy(cc)
+        for irow in range(cc.shape[0]):
+            self.assertEqual(sequential_hierarchy(cc[irow]), list(hcc[irow]))
+
+
+class TestApplyHierarchy(unittest.TestCase):
+    """Test functions apply_hierarchy and impose_hierarchy_2."""
+
+    def test_apply_hierarchy(self):
+        """v22h79h1 - test apply_hierarchy on a set of CCs."""
+        self.assertEqual(set([8, 17]), v22h79h1.apply_hierarchy([8, 9, 12, 17, 19]))
+        self.assertEqual(set([27, 166]), v22h79h1.apply_hierarchy([27, 80, 166, 167]))
+        self.assertEqual(set(), v22h79h1.apply_hierarchy([]))
+
+    def test_impose_hierarchy_2(self):
+        """v22h79h1 - test impose_hierarchy_2 on diagnosis mappings."""
+        diags_to_hccs = [{'cc': cc} for cc in [19, 2, 17, 18, 19]]
+        diags_to_hccs = v22h79h1.impose_hierarchy_2(diags_to_hccs)
+        self.assertEqual([0, 2, 17, 0, 0], [el['hcc'] for el in diags_to_hccs])
+
+
+if __name__ == '__main__':
+    unittest.main()